@@ -0,0 +1,212 @@
+"""Partition charts and extracted_data by upload month
+
+Moves databases created before monthly partitioning to the current layout:
+charts and extracted_data are recreated with composite primary keys (and as
+RANGE partitioned tables on PostgreSQL), existing rows are copied over, and the
+columns added for scheduling, derivatives and extraction versioning are
+backfilled. Databases already created in the current layout by the
+application's create_all only get the missing auxiliary tables.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.auth import get_tenant_id
+from app.core.config import settings
+from app.db.partitioning import (
+    add_months,
+    create_default_partition_sql,
+    create_partition_sql,
+    month_start,
+    PARTITIONED_TABLES,
+)
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# Extraction version stamped on results produced before versioning existed;
+# it never matches a real version, so these charts count as stale
+LEGACY_EXTRACTION_VERSION = "legacy"
+
+
+def _is_legacy_layout(inspector) -> bool:
+    columns = {column["name"] for column in inspector.get_columns("charts")}
+    return "tenant_id" not in columns
+
+
+def _rename_legacy_tables(inspector, postgres: bool):
+    for table in ("extracted_data", "charts"):
+        for index in inspector.get_indexes(table):
+            op.drop_index(index["name"], table_name=table)
+
+    if postgres:
+        # Keep the serial sequence (and its position) for the new extracted_data table
+        op.execute("ALTER TABLE extracted_data ALTER COLUMN id DROP DEFAULT")
+        op.execute("ALTER SEQUENCE IF EXISTS extracted_data_id_seq OWNED BY NONE")
+        for table in ("extracted_data", "charts"):
+            pk_name = inspector.get_pk_constraint(table)["name"]
+            op.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {pk_name} TO {table}_legacy_pkey")
+
+    op.rename_table("extracted_data", "extracted_data_legacy")
+    op.rename_table("charts", "charts_legacy")
+
+
+def _create_partitioned_tables(postgres: bool):
+    # Composite primary keys with the partition key on PostgreSQL only; SQLite
+    # only assigns IDs to a single-column INTEGER PRIMARY KEY
+    op.create_table(
+        "charts",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("original_filename", sa.String()),
+        sa.Column("gcs_uri", sa.String(), nullable=False),
+        sa.Column("content_type", sa.String()),
+        sa.Column("upload_timestamp", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("error_message", sa.Text()),
+        sa.Column("scheduling_class", sa.String(), nullable=False),
+        sa.Column("tenant_id", sa.String()),
+        sa.Column("derivatives_ready", sa.Boolean(), nullable=False),
+        sa.Column("extraction_version", sa.String()),
+        sa.PrimaryKeyConstraint("id", "upload_timestamp") if postgres else sa.PrimaryKeyConstraint("id"),
+        postgresql_partition_by="RANGE (upload_timestamp)",
+    )
+    op.create_index("ix_charts_tenant_id", "charts", ["tenant_id"])
+    op.create_index("ix_charts_extraction_version", "charts", ["extraction_version"])
+
+    op.create_table(
+        "extracted_data",
+        sa.Column("id", sa.BigInteger(), sa.Sequence("extracted_data_id_seq"), nullable=False) if postgres
+        else sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), nullable=False, autoincrement=True),
+        sa.Column("chart_id", sa.String(), nullable=False),
+        sa.Column("chart_upload_timestamp", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("item_name", sa.String(), nullable=False),
+        sa.Column("item_value", sa.Text()),
+        sa.Column("extracted_timestamp", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("extraction_version", sa.String()),
+        sa.Column("prompt_hash", sa.String()),
+        sa.Column("model_name", sa.String()),
+        sa.Column("extraction_config", sa.Text()),
+        sa.PrimaryKeyConstraint("id", "chart_upload_timestamp") if postgres else sa.PrimaryKeyConstraint("id"),
+        sa.ForeignKeyConstraint(
+            ["chart_id", "chart_upload_timestamp"] if postgres else ["chart_id"],
+            ["charts.id", "charts.upload_timestamp"] if postgres else ["charts.id"]
+        ),
+        postgresql_partition_by="RANGE (chart_upload_timestamp)",
+    )
+    op.create_index("ix_extracted_data_chart_id", "extracted_data", ["chart_id"])
+    op.create_index("ix_extracted_data_item_name", "extracted_data", ["item_name"])
+
+
+def _create_auxiliary_tables(existing: set):
+    if "archived_partitions" not in existing:
+        op.create_table(
+            "archived_partitions",
+            sa.Column("partition_name", sa.String(), primary_key=True),
+            sa.Column("archived_timestamp", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        )
+    if "reextraction_jobs" not in existing:
+        op.create_table(
+            "reextraction_jobs",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("target_version", sa.String(), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("total_charts", sa.Integer(), nullable=False),
+            sa.Column("processed_charts", sa.Integer(), nullable=False),
+            sa.Column("failed_charts", sa.Integer(), nullable=False),
+            sa.Column("last_chart_id", sa.String()),
+            sa.Column("error_message", sa.Text()),
+            sa.Column("created_timestamp", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+            sa.Column("updated_timestamp", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        )
+        op.create_index("ix_reextraction_jobs_target_version", "reextraction_jobs", ["target_version"])
+
+
+def _create_partitions(bind, legacy: bool):
+    current = month_start(datetime.now(timezone.utc))
+    first = current
+    if legacy:
+        oldest = bind.execute(sa.text("SELECT MIN(upload_timestamp) FROM charts_legacy")).scalar()
+        if oldest is not None:
+            first = min(first, month_start(oldest))
+
+    last = add_months(current, settings.PARTITION_PREMAKE_MONTHS)
+    for table in PARTITIONED_TABLES:
+        op.execute(create_default_partition_sql(table))
+        month = first
+        while month <= last:
+            op.execute(create_partition_sql(table, month))
+            month = add_months(month, 1)
+
+
+def _copy_legacy_rows(bind, postgres: bool):
+    bind.execute(
+        sa.text(
+            "INSERT INTO charts (id, original_filename, gcs_uri, content_type, upload_timestamp, status, "
+            "error_message, scheduling_class, tenant_id, derivatives_ready, extraction_version) "
+            "SELECT id, original_filename, gcs_uri, content_type, upload_timestamp, status, error_message, "
+            ":scheduling_class, :tenant_id, :derivatives_ready, "
+            "CASE WHEN status = :completed THEN :extraction_version END "
+            "FROM charts_legacy"
+        ),
+        {
+            "scheduling_class": "interactive",
+            # Every existing upload came in through the single configured API key
+            "tenant_id": get_tenant_id(settings.API_KEY),
+            # Derivatives were never generated for these images; the original is served instead
+            "derivatives_ready": False,
+            "completed": "completed",
+            "extraction_version": LEGACY_EXTRACTION_VERSION,
+        },
+    )
+    bind.execute(
+        sa.text(
+            "INSERT INTO extracted_data (id, chart_id, chart_upload_timestamp, item_name, item_value, "
+            "extracted_timestamp, extraction_version) "
+            "SELECT e.id, e.chart_id, c.upload_timestamp, e.item_name, e.item_value, e.extracted_timestamp, "
+            ":extraction_version "
+            "FROM extracted_data_legacy e JOIN charts_legacy c ON c.id = e.chart_id"
+        ),
+        {"extraction_version": LEGACY_EXTRACTION_VERSION},
+    )
+    if postgres:
+        op.execute(
+            "SELECT setval('extracted_data_id_seq', COALESCE(MAX(id), 0) + 1, false) FROM extracted_data"
+        )
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing = set(inspector.get_table_names())
+    postgres = bind.dialect.name == "postgresql"
+
+    if "charts" in existing and not _is_legacy_layout(inspector):
+        _create_auxiliary_tables(existing)
+        return
+
+    legacy = "charts" in existing
+    if legacy:
+        _rename_legacy_tables(inspector, postgres)
+    if postgres:
+        op.execute("CREATE SEQUENCE IF NOT EXISTS extracted_data_id_seq")
+
+    _create_partitioned_tables(postgres)
+    _create_auxiliary_tables(existing)
+    if postgres:
+        _create_partitions(bind, legacy)
+
+    if legacy:
+        _copy_legacy_rows(bind, postgres)
+        op.drop_table("extracted_data_legacy")
+        op.drop_table("charts_legacy")
+
+
+def downgrade():
+    raise RuntimeError("Converting partitioned tables back to the unpartitioned layout is not supported")
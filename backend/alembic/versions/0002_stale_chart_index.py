@@ -0,0 +1,43 @@
+"""Index stale charts by extraction version and chart ID
+
+Re-extraction reads stale charts one extraction version at a time in chart ID
+order, so the single-column extraction_version index is replaced by a
+(extraction_version, id) index over completed charts, and jobs record the
+version they stopped at.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    chart_indexes = {index["name"] for index in inspector.get_indexes("charts")}
+    if "ix_charts_extraction_version" in chart_indexes:
+        op.drop_index("ix_charts_extraction_version", table_name="charts")
+    if "ix_charts_extraction_version_id" not in chart_indexes:
+        op.create_index(
+            "ix_charts_extraction_version_id",
+            "charts",
+            ["extraction_version", "id"],
+            postgresql_where=sa.text("status = 'completed'")
+        )
+
+    job_columns = {column["name"] for column in inspector.get_columns("reextraction_jobs")}
+    if "last_extraction_version" not in job_columns:
+        op.add_column("reextraction_jobs", sa.Column("last_extraction_version", sa.String()))
+
+
+def downgrade():
+    op.drop_column("reextraction_jobs", "last_extraction_version")
+    op.drop_index("ix_charts_extraction_version_id", table_name="charts")
+    op.create_index("ix_charts_extraction_version", "charts", ["extraction_version"])
@@ -1,3 +1,4 @@
+import hashlib
 from fastapi import Security, HTTPException, status
 from fastapi.security.api_key import APIKeyHeader
 from app.core.config import settings
@@ -11,3 +12,7 @@ async def verify_api_key(api_key: str = Security(api_key_header)):
             detail="Invalid API Key",
         )
     return api_key
+
+def get_tenant_id(api_key: str) -> str:
+    """Derive a stable tenant identifier from an API key without storing the key itself"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
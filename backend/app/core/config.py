@@ -1,6 +1,6 @@
 import os
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     # API related
@@ -22,13 +22,70 @@ class Settings(BaseSettings):
     MINIO_ENDPOINT: str = os.getenv("MINIO_ENDPOINT", "localhost:9000")
     MINIO_ACCESS_KEY: str = os.getenv("MINIO_ACCESS_KEY", "minioadmin")
     MINIO_SECRET_KEY: str = os.getenv("MINIO_SECRET_KEY", "minioadmin")
+    MINIO_SECURE: bool = os.getenv("MINIO_SECURE", "False").lower() == "true"
+    # Host clients reach MinIO at, used for presigned URLs (defaults to MINIO_ENDPOINT)
+    MINIO_PUBLIC_ENDPOINT: str = os.getenv("MINIO_PUBLIC_ENDPOINT", "")
+    
+    # Bulk re-extraction
+    REEXTRACTION_CHUNK_SIZE: int = int(os.getenv("REEXTRACTION_CHUNK_SIZE", "50"))
+    REEXTRACTION_CHUNK_DELAY_SECONDS: float = float(os.getenv("REEXTRACTION_CHUNK_DELAY_SECONDS", "1"))
+    # A processing job that has not reported progress for this long is considered abandoned
+    REEXTRACTION_LEASE_SECONDS: int = int(os.getenv("REEXTRACTION_LEASE_SECONDS", "900"))
+    
+    # Table partitioning and archival (PostgreSQL only)
+    PARTITION_PREMAKE_MONTHS: int = int(os.getenv("PARTITION_PREMAKE_MONTHS", "3"))
+    ARCHIVE_AFTER_MONTHS: int = int(os.getenv("ARCHIVE_AFTER_MONTHS", "12"))
+    # Tablespace on cheaper storage for archived partitions (empty keeps them in place)
+    ARCHIVE_TABLESPACE: str = os.getenv("ARCHIVE_TABLESPACE", "")
+    ARCHIVE_STORAGE_CLASS: str = os.getenv("ARCHIVE_STORAGE_CLASS", "COLDLINE")
     
     # Gemini API
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
+    GEMINI_MODEL_NAME: str = os.getenv("GEMINI_MODEL_NAME", "gemini-2.5-pro-vision")
+    GEMINI_REQUEST_TIMEOUT_SECONDS: float = float(os.getenv("GEMINI_REQUEST_TIMEOUT_SECONDS", "180"))
+    
+    # Tiled extraction of large pages
+    TILED_EXTRACTION_ENABLED: bool = os.getenv("TILED_EXTRACTION_ENABLED", "False").lower() == "true"
+    # Pages above this many pixels are split into tiles of at most TILE_TARGET_PIXELS
+    TILE_MIN_PAGE_PIXELS: int = int(os.getenv("TILE_MIN_PAGE_PIXELS", str(12_000_000)))
+    TILE_TARGET_PIXELS: int = int(os.getenv("TILE_TARGET_PIXELS", str(4_000_000)))
+    TILE_OVERLAP_RATIO: float = float(os.getenv("TILE_OVERLAP_RATIO", "0.1"))
+    TILE_MAX_OUTPUT_TOKENS: int = int(os.getenv("TILE_MAX_OUTPUT_TOKENS", "2048"))
+    TILE_MAX_CONCURRENCY: int = int(os.getenv("TILE_MAX_CONCURRENCY", "4"))
+    
+    # Vertex AI (used when GEMINI_API_KEY is unset, or as the hedge backend when a project is set)
+    GOOGLE_CLOUD_PROJECT: str = os.getenv("GOOGLE_CLOUD_PROJECT", "")
+    VERTEX_LOCATION: str = os.getenv("VERTEX_LOCATION", "us-central1")
+    
+    # Gemini request hedging
+    GEMINI_HEDGE_PERCENTILE: float = float(os.getenv("GEMINI_HEDGE_PERCENTILE", "0.95"))
+    GEMINI_HEDGE_INITIAL_DELAY_SECONDS: float = float(os.getenv("GEMINI_HEDGE_INITIAL_DELAY_SECONDS", "60"))
+    GEMINI_HEDGE_MIN_DELAY_SECONDS: float = float(os.getenv("GEMINI_HEDGE_MIN_DELAY_SECONDS", "5"))
+    # Extra requests allowed as a fraction of all calls (0 disables hedging, failover still applies)
+    GEMINI_HEDGE_BUDGET_RATIO: float = float(os.getenv("GEMINI_HEDGE_BUDGET_RATIO", "0.1"))
+    GEMINI_CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("GEMINI_CIRCUIT_FAILURE_THRESHOLD", "5"))
+    GEMINI_CIRCUIT_RESET_SECONDS: float = float(os.getenv("GEMINI_CIRCUIT_RESET_SECONDS", "60"))
     
     # File upload settings
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10 MB
     ALLOWED_CONTENT_TYPES: List[str] = ["image/jpeg", "image/png"]
+    
+    # Derivative images (thumbnails and previews)
+    THUMBNAIL_MAX_SIZE: int = int(os.getenv("THUMBNAIL_MAX_SIZE", "320"))
+    PREVIEW_MAX_SIZE: int = int(os.getenv("PREVIEW_MAX_SIZE", "1600"))
+    DERIVATIVE_JPEG_QUALITY: int = int(os.getenv("DERIVATIVE_JPEG_QUALITY", "80"))
+    DERIVATIVE_WORKERS: int = int(os.getenv("DERIVATIVE_WORKERS", "2"))
+    IMAGE_CACHE_MAX_AGE_SECONDS: int = int(os.getenv("IMAGE_CACHE_MAX_AGE_SECONDS", str(365 * 24 * 60 * 60)))
+    SIGNED_URL_EXPIRATION_SECONDS: int = int(os.getenv("SIGNED_URL_EXPIRATION_SECONDS", "300"))
+
+    # Extraction scheduling
+    DEFAULT_SCHEDULING_CLASS: str = os.getenv("DEFAULT_SCHEDULING_CLASS", "interactive")
+    # Relative share of extraction capacity per scheduling class
+    SCHEDULING_CLASS_WEIGHTS: Dict[str, int] = {"interactive": 8, "bulk": 1}
+    EXTRACTION_MAX_CONCURRENCY: int = int(os.getenv("EXTRACTION_MAX_CONCURRENCY", "8"))
+    # Slots that bulk work may never occupy, so interactive uploads start immediately
+    EXTRACTION_RESERVED_INTERACTIVE_SLOTS: int = int(os.getenv("EXTRACTION_RESERVED_INTERACTIVE_SLOTS", "2"))
+    EXTRACTION_MAX_CONCURRENCY_PER_TENANT: int = int(os.getenv("EXTRACTION_MAX_CONCURRENCY_PER_TENANT", "4"))
 
     class Config:
         env_file = ".env"
@@ -64,3 +64,37 @@ ADVANCED_EXTRACTION_PROMPT = """
 
 JSONデータのみを返してください。
 """
+
+# Template for extracting one tile of a large chart page (see layout_service)
+TILE_EXTRACTION_PROMPT = """
+以下の画像は、大きなカルテページを分割した一部分（タイル）です。このタイルに写っている範囲から、次の項目を抽出してください：
+
+1. 主訴
+2. 現病歴
+3. 既往歴
+4. 家族歴
+5. 身体所見
+6. 検査所見
+7. 診断
+8. 治療計画
+
+以下の点に注意してください：
+- このタイルに写っている記載のみを抽出してください。他の部分の内容を推測しないでください
+- 記載がタイルの端で途切れている場合は、見えている部分のみをそのまま返してください
+- 項目の見出しがタイル外にある場合でも、内容から適切な項目を推測してください
+- 手書き文字の認識に努め、テキストが不明瞭な場合は、その旨を示してください（例：「判読不能」）
+
+抽出結果を以下のJSON形式で返してください。このタイルに該当する記載がない項目は空文字列を返してください。
+{
+  "主訴": "",
+  "現病歴": "",
+  "既往歴": "", 
+  "家族歴": "", 
+  "身体所見": "", 
+  "検査所見": "", 
+  "診断": "", 
+  "治療計画": ""
+}
+
+JSONデータのみを返してください。
+"""
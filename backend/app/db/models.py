@@ -1,9 +1,11 @@
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Enum, Boolean, Float, BigInteger
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey, ForeignKeyConstraint, Enum, Boolean, Float, BigInteger, Integer, Sequence, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
 from uuid import uuid4
-from app.db.session import Base
+from datetime import datetime, timezone
+from app.db.session import Base, PARTITIONED_LAYOUT
+from app.db.partitioning import new_chart_id, chart_id_timestamp
 
 class ProcessStatus(str, enum.Enum):
     PENDING = "pending"
@@ -11,28 +13,107 @@ class ProcessStatus(str, enum.Enum):
     COMPLETED = "completed"
     FAILED = "failed"
 
+class SchedulingClass(str, enum.Enum):
+    INTERACTIVE = "interactive"
+    BULK = "bulk"
+
+def _default_upload_timestamp(context):
+    # Match the timestamp embedded in the chart ID so lookups by ID hit the right partition
+    chart_id = context.get_current_parameters().get("id")
+    return chart_id_timestamp(chart_id) or datetime.now(timezone.utc)
+
 class Chart(Base):
     __tablename__ = "charts"
+    # Monthly range partitions on PostgreSQL (see app/db/partitioning.py);
+    # the partition key has to be part of the primary key there
+    __table_args__ = (
+        # Stale charts are read one extraction version at a time in chart ID order
+        Index(
+            "ix_charts_extraction_version_id",
+            "extraction_version",
+            "id",
+            postgresql_where=text("status = 'completed'")
+        ),
+        {"postgresql_partition_by": "RANGE (upload_timestamp)"},
+    )
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid4()))
+    id = Column(String, primary_key=True, default=new_chart_id)
     original_filename = Column(String)
     gcs_uri = Column(String, nullable=False)
     content_type = Column(String)
-    upload_timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    upload_timestamp = Column(
+        DateTime(timezone=True),
+        primary_key=PARTITIONED_LAYOUT,
+        default=_default_upload_timestamp,
+        server_default=func.now(),
+        nullable=False
+    )
     status = Column(String, nullable=False, default=ProcessStatus.PENDING.value)
     error_message = Column(Text)
+    scheduling_class = Column(String, nullable=False, default=SchedulingClass.INTERACTIVE.value)
+    tenant_id = Column(String, index=True)
+    derivatives_ready = Column(Boolean, nullable=False, default=False)
+    # Extraction version of the current result set
+    extraction_version = Column(String)
     
     # Relationship with ExtractedData
     extracted_data = relationship("ExtractedData", back_populates="chart", cascade="all, delete-orphan")
+    
+    @property
+    def current_extracted_data(self):
+        """Extracted data of the current result set (re-extractions keep older sets)"""
+        return [data for data in self.extracted_data if data.extraction_version == self.extraction_version]
+
+# PostgreSQL before 17 does not support identity columns on partitioned tables
+extracted_data_id_seq = Sequence("extracted_data_id_seq")
 
 class ExtractedData(Base):
     __tablename__ = "extracted_data"
+    # Partitioned by the upload month of the parent chart so both tables share partition bounds
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["chart_id", "chart_upload_timestamp"] if PARTITIONED_LAYOUT else ["chart_id"],
+            ["charts.id", "charts.upload_timestamp"] if PARTITIONED_LAYOUT else ["charts.id"]
+        ),
+        {"postgresql_partition_by": "RANGE (chart_upload_timestamp)"},
+    )
     
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
-    chart_id = Column(String, ForeignKey("charts.id"), nullable=False, index=True)
+    if PARTITIONED_LAYOUT:
+        id = Column(BigInteger, extracted_data_id_seq, primary_key=True)
+    else:
+        id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    chart_id = Column(String, nullable=False, index=True)
+    chart_upload_timestamp = Column(DateTime(timezone=True), primary_key=PARTITIONED_LAYOUT, nullable=False)
     item_name = Column(String, nullable=False, index=True)
     item_value = Column(Text)
     extracted_timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Stamp of the prompt, model and generation config that produced this value
+    extraction_version = Column(String)
+    prompt_hash = Column(String)
+    model_name = Column(String)
+    extraction_config = Column(Text)
     
     # Relationship with Chart
     chart = relationship("Chart", back_populates="extracted_data")
+
+class ArchivedPartition(Base):
+    __tablename__ = "archived_partitions"
+    
+    partition_name = Column(String, primary_key=True)
+    archived_timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class ReextractionJob(Base):
+    __tablename__ = "reextraction_jobs"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid4()))
+    target_version = Column(String, nullable=False, index=True)
+    status = Column(String, nullable=False, default=ProcessStatus.PENDING.value)
+    total_charts = Column(Integer, nullable=False, default=0)
+    processed_charts = Column(Integer, nullable=False, default=0)
+    failed_charts = Column(Integer, nullable=False, default=0)
+    # Extraction version and chart ID last handled; the job resumes after them
+    last_extraction_version = Column(String)
+    last_chart_id = Column(String)
+    error_message = Column(Text)
+    created_timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_timestamp = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -0,0 +1,205 @@
+"""
+Monthly range partitioning for the charts and extracted_data tables.
+
+On PostgreSQL both tables are partitioned by the chart upload month. Chart IDs
+are time-ordered UUIDs (version 7) whose embedded timestamp is the upload
+timestamp, so a lookup by chart ID can be pruned to a single partition.
+Rows outside the pre-made months land in a DEFAULT partition and are moved
+into their monthly partition once it is created. Other databases (e.g. SQLite in development) use plain tables.
+"""
+import os
+import re
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# Partitioned table -> partition key column
+PARTITIONED_TABLES = {
+    "charts": "upload_timestamp",
+    "extracted_data": "chart_upload_timestamp",
+}
+
+_PARTITION_SUFFIX = re.compile(r"_y(\d{4})m(\d{2})$")
+
+
+def new_chart_id(timestamp: Optional[datetime] = None) -> str:
+    """Generate a UUIDv7 chart ID embedding the upload timestamp (millisecond precision)"""
+    timestamp = timestamp or datetime.now(timezone.utc)
+    unix_ms = int(timestamp.timestamp() * 1000) & ((1 << 48) - 1)
+    rand = int.from_bytes(os.urandom(10), "big")
+
+    value = unix_ms << 80
+    value |= 0x7 << 76  # version
+    value |= ((rand >> 62) & 0xFFF) << 64
+    value |= 0b10 << 62  # RFC 4122 variant
+    value |= rand & ((1 << 62) - 1)
+    return str(uuid.UUID(int=value))
+
+
+def chart_id_timestamp(chart_id: str) -> Optional[datetime]:
+    """Return the upload timestamp embedded in a UUIDv7 chart ID, or None for other IDs"""
+    try:
+        parsed = uuid.UUID(chart_id)
+    except (ValueError, TypeError):
+        return None
+    if parsed.version != 7:
+        return None
+    unix_ms = parsed.int >> 80
+    return datetime.fromtimestamp(unix_ms // 1000, tz=timezone.utc) + timedelta(milliseconds=unix_ms % 1000)
+
+
+def month_start(timestamp: datetime) -> datetime:
+    timestamp = timestamp.astimezone(timezone.utc)
+    return datetime(timestamp.year, timestamp.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + (month.month - 1) + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def partition_bounds(month: datetime) -> str:
+    return f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+
+
+def create_partition_sql(table: str, month: datetime) -> str:
+    return f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} {partition_bounds(month)}"
+
+
+def create_default_partition_sql(table: str) -> str:
+    return f"CREATE TABLE IF NOT EXISTS {default_partition_name(table)} PARTITION OF {table} DEFAULT"
+
+
+def partition_month(name: str) -> Optional[datetime]:
+    """Parse the month covered by a partition from its name"""
+    match = _PARTITION_SUFFIX.search(name)
+    if not match:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+
+
+async def is_partitioned(conn: AsyncConnection, table: str) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    result = await conn.execute(
+        text(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = :table"
+        ),
+        {"table": table},
+    )
+    return result.first() is not None
+
+
+async def list_partitions(conn: AsyncConnection, table: str) -> List[Tuple[str, datetime]]:
+    """List (partition name, month) pairs of a partitioned table, oldest first"""
+    result = await conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table"
+        ),
+        {"table": table},
+    )
+    partitions = []
+    for (name,) in result:
+        month = partition_month(name)
+        if month is not None:
+            partitions.append((name, month))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+async def _table_exists(conn: AsyncConnection, name: str) -> bool:
+    result = await conn.execute(text("SELECT to_regclass(:name)"), {"name": name})
+    return result.scalar() is not None
+
+
+async def _default_has_rows(conn: AsyncConnection, table: str, month: datetime) -> bool:
+    key = PARTITIONED_TABLES[table]
+    result = await conn.execute(
+        text(
+            f"SELECT 1 FROM {default_partition_name(table)} "
+            f"WHERE {key} >= :lower AND {key} < :upper LIMIT 1"
+        ),
+        {"lower": month, "upper": add_months(month, 1)},
+    )
+    return result.first() is not None
+
+
+async def _create_month_partitions(conn: AsyncConnection, tables: List[str], month: datetime):
+    """
+    Create the partitions of one month, moving rows out of the DEFAULT partitions
+
+    PostgreSQL refuses to create a partition while the DEFAULT partition holds
+    rows in its range, so in that case the partition is built as a plain table,
+    the rows are moved into it and it is attached afterwards. extracted_data rows
+    are moved before the charts rows they reference, and attached after them.
+    """
+    staged = []
+    for table in reversed(tables):
+        name = partition_name(table, month)
+        if await _table_exists(conn, name):
+            continue
+        if not await _default_has_rows(conn, table, month):
+            await conn.execute(text(create_partition_sql(table, month)))
+            continue
+
+        key = PARTITIONED_TABLES[table]
+        default = default_partition_name(table)
+        params = {"lower": month, "upper": add_months(month, 1)}
+        await conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)"))
+        await conn.execute(
+            text(f"INSERT INTO {name} SELECT * FROM {default} WHERE {key} >= :lower AND {key} < :upper"),
+            params,
+        )
+        await conn.execute(
+            text(f"DELETE FROM {default} WHERE {key} >= :lower AND {key} < :upper"),
+            params,
+        )
+        staged.append(table)
+
+    for table in tables:
+        if table in staged:
+            await conn.execute(
+                text(f"ALTER TABLE {table} ATTACH PARTITION {partition_name(table, month)} {partition_bounds(month)}")
+            )
+            print(f"Moved rows of {partition_name(table, month)} out of the default partition")
+
+
+async def ensure_monthly_partitions(conn: AsyncConnection, months_ahead: int, months_behind: int = 0):
+    """
+    Create the DEFAULT partitions and the monthly partitions around the current month
+    if they do not exist yet
+
+    Args:
+        conn: Database connection
+        months_ahead: Number of future months to create partitions for
+        months_behind: Number of past months to create partitions for
+    """
+    if conn.dialect.name != "postgresql":
+        return
+
+    tables = []
+    for table in PARTITIONED_TABLES:
+        if not await is_partitioned(conn, table):
+            print(f"Table {table} is not partitioned; skipping partition creation")
+            continue
+        await conn.execute(text(create_default_partition_sql(table)))
+        tables.append(table)
+
+    current = month_start(datetime.now(timezone.utc))
+    for offset in range(-months_behind, months_ahead + 1):
+        await _create_month_partitions(conn, tables, add_months(current, offset))
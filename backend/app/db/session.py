@@ -1,6 +1,8 @@
+from sqlalchemy import inspect
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
 from app.core.config import settings
+from app.db.partitioning import ensure_monthly_partitions, is_partitioned, PARTITIONED_TABLES
 
 # Convert URL to async format
 DATABASE_URL = settings.DATABASE_URL
@@ -10,6 +12,10 @@ elif DATABASE_URL.startswith('sqlite://'):
     DATABASE_URL = DATABASE_URL.replace('sqlite://', 'sqlite+aiosqlite://')
 
 engine = create_async_engine(DATABASE_URL, echo=True)
+
+# Only PostgreSQL uses the partitioned layout with the partition key in the
+# primary keys; SQLite only assigns IDs to a single-column INTEGER PRIMARY KEY
+PARTITIONED_LAYOUT = engine.dialect.name == "postgresql"
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 Base = declarative_base()
@@ -21,6 +27,40 @@ async def get_db():
         finally:
             await session.close()
 
+def _outdated_tables(sync_conn) -> list:
+    """Existing tables whose columns or primary key differ from the models"""
+    inspector = inspect(sync_conn)
+    outdated = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        primary_key = set(inspector.get_pk_constraint(table.name)["constrained_columns"])
+        if not set(table.columns.keys()) <= columns or primary_key != set(table.primary_key.columns.keys()):
+            outdated.append(table.name)
+    return outdated
+
+async def check_schema(conn):
+    """
+    Refuse to start on a database created with an older table layout
+
+    create_all only creates missing tables, so an old charts table would otherwise
+    be used as-is; the migration in alembic/ converts it.
+    """
+    outdated = await conn.run_sync(_outdated_tables)
+    existing = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names())
+    if conn.dialect.name == "postgresql":
+        for table in PARTITIONED_TABLES:
+            if table in existing and table not in outdated and not await is_partitioned(conn, table):
+                outdated.append(table)
+    if outdated:
+        raise RuntimeError(
+            f"Database tables {', '.join(outdated)} use an outdated layout; "
+            "run `alembic upgrade head` before starting the service"
+        )
+
 async def create_tables():
     async with engine.begin() as conn:
+        await check_schema(conn)
         await conn.run_sync(Base.metadata.create_all)
+        await ensure_monthly_partitions(conn, settings.PARTITION_PREMAKE_MONTHS)
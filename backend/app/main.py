@@ -1,8 +1,9 @@
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.routers import charts
-from app.db.session import create_tables
+from app.routers import charts, reextraction
+from app.db.session import create_tables, engine
+from app.tasks.process_chart import resubmit_unfinished_charts
 
 app = FastAPI(
     title="Medical Chart Digitizer API",
@@ -23,11 +24,17 @@ app.add_middleware(
 
 # Include routers
 app.include_router(charts.router, prefix=settings.API_V1_STR)
+app.include_router(reextraction.router, prefix=settings.API_V1_STR)
 
 # Create database tables on startup if they don't exist
 @app.on_event("startup")
 async def startup_db_client():
     await create_tables()
+    
+    # Extraction queues are in-memory; pick up charts a previous run did not finish
+    resubmitted = await resubmit_unfinished_charts(engine.url.render_as_string(hide_password=False))
+    if resubmitted:
+        print(f"Resubmitted {resubmitted} unfinished charts for extraction")
 
 @app.get("/")
 async def root():
@@ -1,19 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, BackgroundTasks, Response
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, BackgroundTasks, Header, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
-import uuid
+from typing import List, Optional, Tuple
 import csv
 from io import StringIO
 
-from app.core.auth import verify_api_key
+from app.core.auth import verify_api_key, get_tenant_id
 from app.db.session import get_db
 from app.db.models import ProcessStatus
+from app.db.partitioning import new_chart_id
 import app.services.db_service as db_service
 import app.services.gcs_service as gcs_service
 import app.services.gemini_service as gemini_service
-from app.schemas.chart import ChartCreateResponse, ChartStatusResponse, ChartResultResponse, ExtractedDataItem
+import app.services.image_service as image_service
+import app.services.object_storage as object_storage
+from app.schemas.chart import ChartCreateResponse, ChartStatusResponse, ChartResultResponse, ExtractedDataItem, ImageUrlResponse, SchedulingClass
 from app.core.config import settings
 from app.tasks.process_chart import run_extraction_task
+from app.tasks.generate_derivatives import run_derivative_task
+from app.tasks.scheduler import extraction_scheduler
 
 router = APIRouter(
     prefix="/charts",
@@ -21,10 +25,21 @@ router = APIRouter(
     dependencies=[Depends(verify_api_key)]
 )
 
+def _resolve_scheduling_class(requested: Optional[SchedulingClass]) -> str:
+    """Pick the scheduling class from the request, falling back to the configured default"""
+    if requested is not None:
+        return requested.value
+    scheduling_class = settings.DEFAULT_SCHEDULING_CLASS
+    if scheduling_class not in {c.value for c in SchedulingClass}:
+        return SchedulingClass.INTERACTIVE.value
+    return scheduling_class
+
 @router.post("", response_model=ChartCreateResponse, status_code=status.HTTP_202_ACCEPTED)
 async def upload_chart(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    scheduling_class: Optional[SchedulingClass] = Query(None, description="Scheduling class (interactive or bulk)"),
+    api_key: str = Depends(verify_api_key),
     db: AsyncSession = Depends(get_db),
 ):
     """Upload a medical chart image and start the processing"""
@@ -47,21 +62,31 @@ async def upload_chart(
     await file.seek(0)
     
     # Generate a unique ID for this chart
-    chart_id = str(uuid.uuid4())
+    chart_id = new_chart_id()
+    resolved_class = _resolve_scheduling_class(scheduling_class)
+    tenant_id = get_tenant_id(api_key)
     
     try:
         # Upload the file to GCS/MinIO
         gcs_uri = await gcs_service.upload_file_to_gcs(file, chart_id, file.content_type)
         
         # Create a record in the database
-        chart = await db_service.create_chart_record(db, chart_id, file.filename, gcs_uri, file.content_type)
+        chart = await db_service.create_chart_record(
+            db, chart_id, file.filename, gcs_uri, file.content_type, resolved_class, tenant_id
+        )
+        
+        # Render thumbnail and preview from the bytes already in memory
+        background_tasks.add_task(run_derivative_task, chart_id, gcs_uri, contents, str(db.bind.url))
         
-        # Add background task for processing
-        background_tasks.add_task(run_extraction_task, chart_id, gcs_uri, str(db.bind.url))
+        # Queue processing in the fair scheduler
+        extraction_scheduler.submit(
+            resolved_class, tenant_id, run_extraction_task, chart_id, gcs_uri, str(db.bind.url)
+        )
         
         return ChartCreateResponse(
             chart_id=chart_id,
             status=chart.status,
+            scheduling_class=chart.scheduling_class,
             message="Chart processing started."
         )
     
@@ -112,13 +137,17 @@ async def get_chart_result(
                 item_name=data.item_name,
                 item_value=data.item_value
             )
-            for data in chart.extracted_data
+            for data in chart.current_extracted_data
         ]
         
+        image_base = f"{settings.API_V1_STR}/charts/{chart_id}/image"
         return ChartResultResponse(
             chart_id=chart_id,
             original_filename=chart.original_filename,
             gcs_uri=chart.gcs_uri,
+            image_url=f"{image_base}/original",
+            thumbnail_url=f"{image_base}/thumbnail" if chart.derivatives_ready else None,
+            preview_url=f"{image_base}/preview" if chart.derivatives_ready else None,
             status=chart.status,
             extracted_data=extracted_data
         )
@@ -160,7 +189,7 @@ async def download_csv(
     writer.writerow(["項目名", "内容"])
     
     # Write data rows
-    for data in chart.extracted_data:
+    for data in chart.current_extracted_data:
         writer.writerow([data.item_name, data.item_value])
     
     # Prepare response with CSV content
@@ -169,3 +198,131 @@ async def download_csv(
     response.headers["Content-Type"] = "text/csv"
     
     return response
+
+IMAGE_VARIANTS = ["original", *image_service.DERIVATIVE_SIZES]
+
+async def _get_image_location(db: AsyncSession, chart_id: str, variant: str) -> Tuple[str, str]:
+    """Resolve the storage URI and content type of a chart image variant"""
+    if variant not in IMAGE_VARIANTS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown image variant. Use one of: {', '.join(IMAGE_VARIANTS)}."
+        )
+    
+    chart = await db_service.get_chart_by_id(db, chart_id)
+    if not chart:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chart not found"
+        )
+    
+    if variant == "original":
+        return chart.gcs_uri, chart.content_type
+    
+    if not chart.derivatives_ready:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Image variant not available yet"
+        )
+    return image_service.derivative_uri(chart.gcs_uri, variant), image_service.DERIVATIVE_CONTENT_TYPE
+
+def _parse_range(range_header: str) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """
+    Parse a single-range "bytes=" header into (first, last) positions
+    
+    Returns None for headers that are malformed, use another unit or ask for
+    several ranges; per RFC 9110 those are ignored and the full image is sent.
+    A suffix range ("bytes=-N") is returned as (None, N).
+    """
+    unit, _, byte_range = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in byte_range:
+        return None
+    first_text, separator, last_text = byte_range.strip().partition("-")
+    if not separator or not (first_text or last_text):
+        return None
+    if any(text and not text.isdigit() for text in (first_text, last_text)):
+        return None
+    
+    first = int(first_text) if first_text else None
+    last = int(last_text) if last_text else None
+    if first is not None and last is not None and last < first:
+        return None
+    return first, last
+
+def _resolve_range(byte_range: Tuple[Optional[int], Optional[int]], size: int) -> Tuple[int, int]:
+    """Resolve a parsed range against the object size into inclusive offsets, or raise 416"""
+    first, last = byte_range
+    if first is None:
+        # Suffix range: the last N bytes
+        start, end = max(size - last, 0), size - 1
+        satisfiable = last > 0 and size > 0
+    else:
+        start = first
+        end = min(last if last is not None else size - 1, size - 1)
+        satisfiable = first < size
+    
+    if not satisfiable:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+@router.get("/{chart_id}/image/{variant}")
+async def get_chart_image(
+    chart_id: str,
+    variant: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the original chart image or one of its derivatives (thumbnail, preview)"""
+    gcs_uri, content_type = await _get_image_location(db, chart_id, variant)
+    
+    # Stored images never change, so the ETag only depends on what is requested
+    # and, for derivatives, on the settings they are rendered with
+    tag = image_service.render_tag(variant)
+    etag = f'"{chart_id}-{variant}-{tag}"' if tag else f'"{chart_id}-{variant}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={settings.IMAGE_CACHE_MAX_AGE_SECONDS}, immutable",
+        "Accept-Ranges": "bytes",
+    }
+    
+    if if_none_match:
+        client_etags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in client_etags or "*" in client_etags:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    byte_range = _parse_range(range_header) if range_header else None
+    if byte_range is not None:
+        size = await object_storage.get_object_size(gcs_uri)
+        if size is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Image not found"
+            )
+        start, end = _resolve_range(byte_range, size)
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return Response(
+            content=await object_storage.download_range(gcs_uri, start, end),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=content_type,
+            headers=headers
+        )
+    
+    content = await gcs_service.get_file_from_gcs(gcs_uri)
+    return Response(content=content, media_type=content_type, headers=headers)
+
+@router.get("/{chart_id}/image/{variant}/url", response_model=ImageUrlResponse)
+async def get_chart_image_url(
+    chart_id: str,
+    variant: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a short-lived signed URL to fetch a chart image directly from storage"""
+    gcs_uri, _ = await _get_image_location(db, chart_id, variant)
+    
+    url = await object_storage.generate_signed_url(gcs_uri, settings.SIGNED_URL_EXPIRATION_SECONDS)
+    return ImageUrlResponse(url=url, expires_in=settings.SIGNED_URL_EXPIRATION_SECONDS)
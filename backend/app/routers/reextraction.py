@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.auth import verify_api_key
+from app.core.config import settings
+from app.db.session import get_db
+from app.db.models import ReextractionJob
+import app.services.db_service as db_service
+import app.services.gemini_service as gemini_service
+from app.schemas.reextraction import ReextractionJobResponse
+from app.tasks.reextract_charts import run_reextraction_job
+
+router = APIRouter(
+    prefix="/reextraction-jobs",
+    tags=["Re-extraction"],
+    dependencies=[Depends(verify_api_key)]
+)
+
+def _job_response(job: ReextractionJob) -> ReextractionJobResponse:
+    done = job.processed_charts + job.failed_charts
+    return ReextractionJobResponse(
+        job_id=job.id,
+        target_version=job.target_version,
+        status=job.status,
+        total_charts=job.total_charts,
+        processed_charts=job.processed_charts,
+        failed_charts=job.failed_charts,
+        progress=min(done / job.total_charts, 1.0) if job.total_charts else 1.0,
+        error_message=job.error_message
+    )
+
+@router.post("", response_model=ReextractionJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def start_reextraction(
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+):
+    """Re-extract all charts whose results came from an older prompt, model or config"""
+    current_versions = gemini_service.get_current_extraction_versions()
+    
+    # Resume the unfinished job for this version instead of starting a second one
+    job = await db_service.get_or_create_reextraction_job(db, current_versions[0], current_versions)
+    
+    # Only the caller whose claim succeeds runs the job; others just report on it
+    claimed = await db_service.claim_reextraction_job(db, job.id, settings.REEXTRACTION_LEASE_SECONDS)
+    if claimed is None:
+        return _job_response(await db_service.get_reextraction_job(db, job.id))
+    
+    background_tasks.add_task(run_reextraction_job, claimed.id, str(db.bind.url))
+    return _job_response(claimed)
+
+@router.get("/{job_id}", response_model=ReextractionJobResponse)
+async def get_reextraction_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the progress of a re-extraction job"""
+    job = await db_service.get_reextraction_job(db, job_id)
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Re-extraction job not found"
+        )
+    
+    return _job_response(job)
@@ -9,9 +9,14 @@ class ProcessStatus(str, Enum):
     COMPLETED = "completed"
     FAILED = "failed"
 
+class SchedulingClass(str, Enum):
+    INTERACTIVE = "interactive"
+    BULK = "bulk"
+
 class ChartCreateResponse(BaseModel):
     chart_id: str
     status: str = ProcessStatus.PENDING.value
+    scheduling_class: str = SchedulingClass.INTERACTIVE.value
     message: str
 
 class ChartStatusResponse(BaseModel):
@@ -30,11 +35,18 @@ class ChartResultResponse(BaseModel):
     chart_id: str
     original_filename: Optional[str] = None
     gcs_uri: Optional[str] = None
+    image_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    preview_url: Optional[str] = None
     status: str
     extracted_data: Optional[List[ExtractedDataItem]] = None
     message: Optional[str] = None
     error_message: Optional[str] = None
 
+class ImageUrlResponse(BaseModel):
+    url: str
+    expires_in: int
+
 # For internal use
 class ChartCreate(BaseModel):
     id: str
@@ -42,3 +54,5 @@ class ChartCreate(BaseModel):
     gcs_uri: str
     content_type: str
     status: str = ProcessStatus.PENDING.value
+    scheduling_class: str = SchedulingClass.INTERACTIVE.value
+    tenant_id: Optional[str] = None
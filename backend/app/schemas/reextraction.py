@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class ReextractionJobResponse(BaseModel):
+    job_id: str
+    target_version: str
+    status: str
+    total_charts: int
+    processed_charts: int
+    failed_charts: int
+    progress: float
+    error_message: Optional[str] = None
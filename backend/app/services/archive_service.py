@@ -0,0 +1,88 @@
+import asyncio
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import Chart, ArchivedPartition
+from app.db.partitioning import PARTITIONED_TABLES, add_months, is_partitioned, list_partitions, partition_name
+from app.services import object_storage
+
+# Number of storage class rewrites issued concurrently
+STORAGE_CLASS_BATCH_SIZE = 32
+
+async def archive_partitions(db: AsyncSession, archive_before: datetime) -> List[str]:
+    """
+    Move monthly partitions that ended before a cut-off, and their images, to cheaper storage
+    
+    Source images are rewritten to ARCHIVE_STORAGE_CLASS and, when ARCHIVE_TABLESPACE
+    is set, the charts and extracted_data partitions of the month are moved to that
+    tablespace. Archived months are recorded so the job can be re-run safely.
+    
+    Args:
+        db: Database session
+        archive_before: Partitions whose upper bound is at or before this time are archived
+        
+    Returns:
+        Names of the charts partitions archived in this run
+    """
+    conn = await db.connection()
+    if not await is_partitioned(conn, "charts"):
+        return []
+    
+    result = await db.execute(select(ArchivedPartition.partition_name))
+    already_archived = set(result.scalars().all())
+    
+    archived = []
+    for name, month in await list_partitions(conn, "charts"):
+        upper = add_months(month, 1)
+        if upper > archive_before or name in already_archived:
+            continue
+        
+        await _tier_chart_images(db, month, upper)
+        
+        if settings.ARCHIVE_TABLESPACE:
+            for table in PARTITIONED_TABLES:
+                await _move_to_tablespace(db, partition_name(table, month), settings.ARCHIVE_TABLESPACE)
+        
+        db.add(ArchivedPartition(partition_name=name))
+        await db.commit()
+        archived.append(name)
+    
+    return archived
+
+async def _tier_chart_images(db: AsyncSession, lower: datetime, upper: datetime):
+    # The range predicate on the partition key limits the scan to one partition
+    stmt = (
+        select(Chart.gcs_uri)
+        .where(Chart.upload_timestamp >= lower, Chart.upload_timestamp < upper)
+        .execution_options(yield_per=1000)
+    )
+    batch = []
+    async for gcs_uri in await db.stream_scalars(stmt):
+        batch.append(gcs_uri)
+        if len(batch) >= STORAGE_CLASS_BATCH_SIZE:
+            await _set_storage_class(batch)
+            batch = []
+    if batch:
+        await _set_storage_class(batch)
+
+async def _set_storage_class(gcs_uris: List[str]):
+    results = await asyncio.gather(
+        *(object_storage.set_storage_class(uri, settings.ARCHIVE_STORAGE_CLASS) for uri in gcs_uris),
+        return_exceptions=True
+    )
+    for uri, result in zip(gcs_uris, results):
+        if isinstance(result, Exception):
+            print(f"Failed to change storage class of {uri}: {result}")
+
+async def _move_to_tablespace(db: AsyncSession, table: str, tablespace: str):
+    await db.execute(text(f'ALTER TABLE "{table}" SET TABLESPACE "{tablespace}"'))
+    result = await db.execute(
+        text("SELECT indexname FROM pg_indexes WHERE tablename = :table"),
+        {"table": table}
+    )
+    for (index_name,) in result.all():
+        await db.execute(text(f'ALTER INDEX "{index_name}" SET TABLESPACE "{tablespace}"'))
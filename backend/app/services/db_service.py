@@ -1,14 +1,44 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update
+from sqlalchemy import update, delete, func, or_, and_
 from sqlalchemy.orm import selectinload
 from typing import List, Optional, Dict, Any
 from uuid import UUID
+from datetime import datetime, timedelta, timezone
 
-from app.db.models import Chart, ExtractedData, ProcessStatus
+from app.db.models import Chart, ExtractedData, ProcessStatus, SchedulingClass, ReextractionJob
+from app.db.partitioning import chart_id_timestamp
 from app.schemas.chart import ChartCreate, ExtractedDataCreate
 
-async def create_chart_record(db: AsyncSession, chart_id: str, filename: str, gcs_uri: str, content_type: str) -> Chart:
+def _chart_partition_filter(chart_id: str) -> list:
+    """
+    Build WHERE clauses selecting a chart, including its partition key when the ID carries it
+    
+    Charts with time-ordered IDs are looked up together with their upload timestamp
+    so PostgreSQL only scans a single monthly partition.
+    """
+    clauses = [Chart.id == chart_id]
+    upload_timestamp = chart_id_timestamp(chart_id)
+    if upload_timestamp is not None:
+        clauses.append(Chart.upload_timestamp == upload_timestamp)
+    return clauses
+
+async def _get_chart_upload_timestamp(db: AsyncSession, chart_id: str):
+    upload_timestamp = chart_id_timestamp(chart_id)
+    if upload_timestamp is not None:
+        return upload_timestamp
+    result = await db.execute(select(Chart.upload_timestamp).where(Chart.id == chart_id))
+    return result.scalar_one()
+
+async def create_chart_record(
+    db: AsyncSession,
+    chart_id: str,
+    filename: str,
+    gcs_uri: str,
+    content_type: str,
+    scheduling_class: str = SchedulingClass.INTERACTIVE.value,
+    tenant_id: Optional[str] = None,
+) -> Chart:
     """
     Create a new chart record in the database
     
@@ -18,6 +48,8 @@ async def create_chart_record(db: AsyncSession, chart_id: str, filename: str, gc
         filename: Original filename
         gcs_uri: GCS or MinIO URI for the image
         content_type: MIME type of the image
+        scheduling_class: Scheduling class used to dispatch the extraction
+        tenant_id: Identifier of the tenant that uploaded the chart
         
     Returns:
         Created Chart record
@@ -27,9 +59,16 @@ async def create_chart_record(db: AsyncSession, chart_id: str, filename: str, gc
         original_filename=filename,
         gcs_uri=gcs_uri,
         content_type=content_type,
-        status=ProcessStatus.PENDING.value
+        status=ProcessStatus.PENDING.value,
+        scheduling_class=scheduling_class,
+        tenant_id=tenant_id
     )
     
+    # Keep the partition key in sync with the timestamp embedded in the chart ID
+    upload_timestamp = chart_id_timestamp(chart_id)
+    if upload_timestamp is not None:
+        chart.upload_timestamp = upload_timestamp
+    
     db.add(chart)
     await db.commit()
     await db.refresh(chart)
@@ -50,7 +89,7 @@ async def update_chart_status(db: AsyncSession, chart_id: str, status: str, erro
     """
     stmt = (
         update(Chart)
-        .where(Chart.id == chart_id)
+        .where(*_chart_partition_filter(chart_id))
         .values(status=status, error_message=error_message if error_message else None)
         .returning(Chart)
     )
@@ -60,6 +99,22 @@ async def update_chart_status(db: AsyncSession, chart_id: str, status: str, erro
     await db.commit()
     return chart
 
+async def mark_derivatives_ready(db: AsyncSession, chart_id: str) -> None:
+    """
+    Record that the thumbnail and preview images of a chart have been stored
+    
+    Args:
+        db: Database session
+        chart_id: Chart ID to update
+    """
+    stmt = (
+        update(Chart)
+        .where(*_chart_partition_filter(chart_id))
+        .values(derivatives_ready=True)
+    )
+    await db.execute(stmt)
+    await db.commit()
+
 async def get_chart_by_id(db: AsyncSession, chart_id: str) -> Optional[Chart]:
     """
     Get a chart record by its ID
@@ -71,10 +126,28 @@ async def get_chart_by_id(db: AsyncSession, chart_id: str) -> Optional[Chart]:
     Returns:
         Chart record or None if not found
     """
-    stmt = select(Chart).where(Chart.id == chart_id)
+    stmt = select(Chart).where(*_chart_partition_filter(chart_id))
     result = await db.execute(stmt)
     return result.scalar_one_or_none()
 
+async def get_unfinished_charts(db: AsyncSession) -> List[Chart]:
+    """
+    Get charts whose extraction has not finished, oldest upload first
+    
+    Args:
+        db: Database session
+        
+    Returns:
+        List of pending or processing Chart records
+    """
+    stmt = (
+        select(Chart)
+        .where(Chart.status.in_([ProcessStatus.PENDING.value, ProcessStatus.PROCESSING.value]))
+        .order_by(Chart.upload_timestamp, Chart.id)
+    )
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
+
 async def get_chart_with_extracted_data(db: AsyncSession, chart_id: str) -> Optional[Chart]:
     """
     Get a chart record with its extracted data by chart ID
@@ -88,37 +161,71 @@ async def get_chart_with_extracted_data(db: AsyncSession, chart_id: str) -> Opti
     """
     stmt = (
         select(Chart)
-        .where(Chart.id == chart_id)
+        .where(*_chart_partition_filter(chart_id))
         .options(selectinload(Chart.extracted_data))
     )
     
     result = await db.execute(stmt)
     return result.scalar_one_or_none()
 
-async def create_extracted_data_records(db: AsyncSession, chart_id: str, data_items: List[Dict[str, str]]) -> List[ExtractedData]:
+async def create_extracted_data_records(
+    db: AsyncSession,
+    chart_id: str,
+    data_items: List[Dict[str, str]],
+    extraction_stamp: Optional[Dict[str, str]] = None
+) -> List[ExtractedData]:
     """
     Create multiple extracted data records for a chart
     
+    The records are stamped with the extraction version and, in the same
+    transaction, become the current result set of the chart. Result sets of
+    other versions are kept; an earlier set of the same version (e.g. after a
+    prompt rollback) is replaced, since the current set is found by version.
+    
     Args:
         db: Database session
         chart_id: ID of the chart these items belong to
         data_items: List of dictionaries with item_name and item_value pairs
+        extraction_stamp: Prompt hash, model name, config and version (see gemini_service.get_extraction_stamp)
         
     Returns:
         List of created ExtractedData records
     """
+    chart_upload_timestamp = await _get_chart_upload_timestamp(db, chart_id)
+    extraction_stamp = extraction_stamp or {}
+    
     # Create ExtractedData objects
     extracted_data_records = [
         ExtractedData(
             chart_id=chart_id,
+            chart_upload_timestamp=chart_upload_timestamp,
             item_name=item["item_name"],
-            item_value=item["item_value"]
+            item_value=item["item_value"],
+            extraction_version=extraction_stamp.get("extraction_version"),
+            prompt_hash=extraction_stamp.get("prompt_hash"),
+            model_name=extraction_stamp.get("model_name"),
+            extraction_config=extraction_stamp.get("extraction_config")
         )
         for item in data_items
     ]
     
-    # Add all records to the session
+    # Replace any set of the same version and switch the chart to the new set in one transaction
+    version = extraction_stamp.get("extraction_version")
+    await db.execute(
+        delete(ExtractedData)
+        .where(
+            ExtractedData.chart_id == chart_id,
+            ExtractedData.chart_upload_timestamp == chart_upload_timestamp,
+            ExtractedData.extraction_version.is_(None) if version is None else ExtractedData.extraction_version == version
+        )
+        .execution_options(synchronize_session=False)
+    )
     db.add_all(extracted_data_records)
+    await db.execute(
+        update(Chart)
+        .where(*_chart_partition_filter(chart_id))
+        .values(extraction_version=version)
+    )
     await db.commit()
     
     # Refresh all records to get their IDs
@@ -126,3 +233,247 @@ async def create_extracted_data_records(db: AsyncSession, chart_id: str, data_it
         await db.refresh(record)
     
     return extracted_data_records
+
+def _stale_chart_filter(current_versions: List[str]) -> list:
+    return [
+        Chart.status == ProcessStatus.COMPLETED.value,
+        or_(Chart.extraction_version.is_(None), Chart.extraction_version.not_in(current_versions)),
+    ]
+
+async def count_stale_charts(db: AsyncSession, current_versions: List[str]) -> int:
+    """
+    Count completed charts whose current results were not produced by a current version
+    
+    Args:
+        db: Database session
+        current_versions: Extraction versions that count as up to date
+        
+    Returns:
+        Number of stale charts
+    """
+    stmt = select(func.count()).select_from(Chart).where(*_stale_chart_filter(current_versions))
+    result = await db.execute(stmt)
+    return result.scalar_one()
+
+async def get_stale_versions(db: AsyncSession, current_versions: List[str]) -> List[Optional[str]]:
+    """
+    Get the extraction versions of stale charts, charts without a version first
+    
+    Args:
+        db: Database session
+        current_versions: Extraction versions that count as up to date
+        
+    Returns:
+        List of stale extraction versions in the order a job walks them
+    """
+    stmt = select(Chart.extraction_version).where(*_stale_chart_filter(current_versions)).distinct()
+    result = await db.execute(stmt)
+    return sorted(result.scalars().all(), key=stale_version_order)
+
+def stale_version_order(version: Optional[str]) -> tuple:
+    """Sort key for the extraction versions walked by a re-extraction job"""
+    return (version is not None, version or "")
+
+async def get_stale_charts(
+    db: AsyncSession,
+    extraction_version: Optional[str],
+    after_chart_id: Optional[str],
+    limit: int
+) -> List[Chart]:
+    """
+    Get the next chunk of completed charts at a stale extraction version in chart ID order
+    
+    The equality on the version lets the (extraction_version, id) index serve
+    both the filter and the order, so each chunk is a short index range scan.
+    
+    Args:
+        db: Database session
+        extraction_version: Stale extraction version to read (None for charts without one)
+        after_chart_id: Only return charts with a larger ID (keyset pagination)
+        limit: Maximum number of charts to return
+        
+    Returns:
+        List of Chart records
+    """
+    if extraction_version is None:
+        version_clause = Chart.extraction_version.is_(None)
+    else:
+        version_clause = Chart.extraction_version == extraction_version
+    
+    stmt = select(Chart).where(Chart.status == ProcessStatus.COMPLETED.value, version_clause)
+    if after_chart_id:
+        stmt = stmt.where(Chart.id > after_chart_id)
+    stmt = stmt.order_by(Chart.id).limit(limit)
+    
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
+
+async def create_reextraction_job(db: AsyncSession, target_version: str, current_versions: List[str]) -> ReextractionJob:
+    """
+    Create a new re-extraction job record
+    
+    Args:
+        db: Database session
+        target_version: Extraction version stale charts are re-extracted with
+        current_versions: Extraction versions that count as up to date
+        
+    Returns:
+        Created ReextractionJob record
+    """
+    job = ReextractionJob(
+        target_version=target_version,
+        status=ProcessStatus.PENDING.value,
+        total_charts=await count_stale_charts(db, current_versions)
+    )
+    
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+async def get_reextraction_job(db: AsyncSession, job_id: str) -> Optional[ReextractionJob]:
+    """
+    Get a re-extraction job by its ID
+    
+    Args:
+        db: Database session
+        job_id: Job ID to retrieve
+        
+    Returns:
+        ReextractionJob record or None if not found
+    """
+    stmt = select(ReextractionJob).where(ReextractionJob.id == job_id)
+    result = await db.execute(stmt)
+    return result.scalar_one_or_none()
+
+async def get_unfinished_reextraction_job(db: AsyncSession, target_version: str) -> Optional[ReextractionJob]:
+    """
+    Get the oldest pending or processing re-extraction job for a version
+    
+    Args:
+        db: Database session
+        target_version: Extraction version of the job
+        
+    Returns:
+        ReextractionJob record or None if there is none
+    """
+    stmt = (
+        select(ReextractionJob)
+        .where(
+            ReextractionJob.target_version == target_version,
+            ReextractionJob.status.in_([ProcessStatus.PENDING.value, ProcessStatus.PROCESSING.value])
+        )
+        .order_by(ReextractionJob.created_timestamp, ReextractionJob.id)
+        .limit(1)
+    )
+    result = await db.execute(stmt)
+    return result.scalar_one_or_none()
+
+async def get_or_create_reextraction_job(
+    db: AsyncSession,
+    target_version: str,
+    current_versions: List[str]
+) -> ReextractionJob:
+    """
+    Get the unfinished re-extraction job for a version, creating one if there is none
+    
+    When two callers create a job at the same time, the newer one is removed again
+    so both end up with the oldest job.
+    
+    Args:
+        db: Database session
+        target_version: Extraction version of the job
+        current_versions: Extraction versions that count as up to date
+        
+    Returns:
+        ReextractionJob record
+    """
+    job = await get_unfinished_reextraction_job(db, target_version)
+    if job is not None:
+        return job
+    
+    created = await create_reextraction_job(db, target_version, current_versions)
+    job = await get_unfinished_reextraction_job(db, target_version)
+    if job.id != created.id:
+        await db.execute(delete(ReextractionJob).where(ReextractionJob.id == created.id))
+        await db.commit()
+    return job
+
+async def claim_reextraction_job(db: AsyncSession, job_id: str, lease_seconds: int) -> Optional[ReextractionJob]:
+    """
+    Atomically take over a pending job, or a processing job whose lease has expired
+    
+    The status and lease check happen in the UPDATE itself, so of several callers
+    claiming the same job only one gets it back.
+    
+    Args:
+        db: Database session
+        job_id: Job ID to claim
+        lease_seconds: Time without progress after which a processing job is abandoned
+        
+    Returns:
+        Claimed ReextractionJob record, or None if another runner holds it
+    """
+    lease_expired = datetime.now(timezone.utc) - timedelta(seconds=lease_seconds)
+    stmt = (
+        update(ReextractionJob)
+        .where(
+            ReextractionJob.id == job_id,
+            or_(
+                ReextractionJob.status == ProcessStatus.PENDING.value,
+                and_(
+                    ReextractionJob.status == ProcessStatus.PROCESSING.value,
+                    ReextractionJob.updated_timestamp < lease_expired
+                )
+            )
+        )
+        .values(status=ProcessStatus.PROCESSING.value, error_message=None, updated_timestamp=func.now())
+        .returning(ReextractionJob)
+        # Let the database evaluate the lease check; SQLite returns naive timestamps
+        .execution_options(synchronize_session="fetch")
+    )
+    result = await db.execute(stmt)
+    job = result.scalar_one_or_none()
+    
+    await db.commit()
+    return job
+
+async def renew_reextraction_job_lease(db: AsyncSession, job_id: str) -> None:
+    """
+    Refresh the lease of a processing job
+    
+    Args:
+        db: Database session
+        job_id: Job ID to renew
+    """
+    stmt = (
+        update(ReextractionJob)
+        .where(ReextractionJob.id == job_id, ReextractionJob.status == ProcessStatus.PROCESSING.value)
+        .values(updated_timestamp=func.now())
+    )
+    await db.execute(stmt)
+    await db.commit()
+
+async def update_reextraction_job(db: AsyncSession, job_id: str, **values: Any) -> ReextractionJob:
+    """
+    Update fields of a re-extraction job record
+    
+    Args:
+        db: Database session
+        job_id: Job ID to update
+        **values: Column values to set
+        
+    Returns:
+        Updated ReextractionJob record
+    """
+    stmt = (
+        update(ReextractionJob)
+        .where(ReextractionJob.id == job_id)
+        .values(**values)
+        .returning(ReextractionJob)
+    )
+    result = await db.execute(stmt)
+    job = result.scalar_one_or_none()
+    
+    await db.commit()
+    return job
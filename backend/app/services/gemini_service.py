@@ -1,9 +1,13 @@
+import asyncio
 import base64
+import hashlib
 import json
-import requests
-from typing import Dict, List, Any, Optional
+import httpx
+from typing import Dict, List, Any, Optional, Tuple
 from app.core.config import settings
-from app.core.prompt_templates import CHART_EXTRACTION_PROMPT, ADVANCED_EXTRACTION_PROMPT
+from app.core.prompt_templates import CHART_EXTRACTION_PROMPT, ADVANCED_EXTRACTION_PROMPT, TILE_EXTRACTION_PROMPT
+from app.services import layout_service
+from app.services.hedging import CircuitBreaker, HedgeBackend, HedgeBudget, HedgedExecutor
 from google.cloud import aiplatform
 from vertexai.preview.language_models import TextGenerationModel
 from vertexai.generative_models import GenerativeModel, Part
@@ -11,12 +15,28 @@ import vertexai
 
 # Initialize Vertex AI
 try:
-    vertexai.init(project="your-project-id")
+    vertexai.init(project=settings.GOOGLE_CLOUD_PROJECT or "your-project-id", location=settings.VERTEX_LOCATION)
 except:
     # Will be properly initialized in production
     pass
 
-async def extract_chart_data(image_bytes: bytes, use_advanced_prompt: bool = False) -> List[Dict[str, str]]:
+GENERATION_CONFIG = {
+    "temperature": 0.4,
+    "top_p": 1,
+    "top_k": 32,
+    "max_output_tokens": 8192
+}
+
+# Smaller output budget per tile; each tile only holds part of the page
+TILE_GENERATION_CONFIG = {**GENERATION_CONFIG, "max_output_tokens": settings.TILE_MAX_OUTPUT_TOKENS}
+
+# The standard items, in output order
+CHART_ITEMS = ["主訴", "現病歴", "既往歴", "家族歴", "身体所見", "検査所見", "診断", "治療計画"]
+
+async def extract_chart_data(
+    image_bytes: bytes,
+    use_advanced_prompt: bool = False
+) -> Tuple[List[Dict[str, str]], Dict[str, str]]:
     """
     Extract structured data from a medical chart image using Gemini API
     
@@ -25,31 +45,89 @@ async def extract_chart_data(image_bytes: bytes, use_advanced_prompt: bool = Fal
         use_advanced_prompt: Whether to use the advanced prompt for difficult OCR cases
         
     Returns:
-        List of dictionaries with item_name and item_value pairs
+        Tuple of the list of dictionaries with item_name and item_value pairs and
+        the extraction stamp (see get_extraction_stamp) of the path that produced them
     """
     try:
-        # For REST API approach
-        if settings.GEMINI_API_KEY:
-            return await _extract_with_rest_api(image_bytes, use_advanced_prompt)
-        # For Vertex AI SDK approach    
-        else:
-            return await _extract_with_vertex_ai(image_bytes, use_advanced_prompt)
+        # Large pages are split into tiles that are extracted in parallel
+        if settings.TILED_EXTRACTION_ENABLED:
+            tiles = await layout_service.split_into_tiles(image_bytes)
+            if tiles:
+                merged = await _extract_tiled(tiles)
+                if merged is not None:
+                    return merged, get_extraction_stamp(use_advanced_prompt, tiled=True)
+        
+        prompt_text = ADVANCED_EXTRACTION_PROMPT if use_advanced_prompt else CHART_EXTRACTION_PROMPT
+        # Hedged across the configured backends (REST API and/or Vertex AI)
+        extracted = await _executor.call(image_bytes, prompt_text, GENERATION_CONFIG)
+        return extracted, get_extraction_stamp(use_advanced_prompt)
     except Exception as e:
         print(f"Gemini API error: {e}")
         raise e
 
-async def _extract_with_rest_api(image_bytes: bytes, use_advanced_prompt: bool = False) -> List[Dict[str, str]]:
+def get_extraction_stamp(use_advanced_prompt: bool = False, tiled: bool = False) -> Dict[str, str]:
+    """
+    Describe the prompt, model and generation config used by extract_chart_data
+    
+    Args:
+        use_advanced_prompt: Whether the advanced prompt is used
+        tiled: Whether the page was extracted tile by tile
+        
+    Returns:
+        Dictionary with prompt_hash, model_name, extraction_config (JSON) and
+        extraction_version, a hash over all of them that changes whenever
+        any of them changes
+    """
+    prompt_text = ADVANCED_EXTRACTION_PROMPT if use_advanced_prompt else CHART_EXTRACTION_PROMPT
+    prompt_hash = hashlib.sha256(prompt_text.encode("utf-8")).hexdigest()[:16]
+    config: Dict[str, Any] = {"generation_config": GENERATION_CONFIG}
+    if tiled:
+        config["tiling"] = {
+            "prompt_hash": hashlib.sha256(TILE_EXTRACTION_PROMPT.encode("utf-8")).hexdigest()[:16],
+            "min_page_pixels": settings.TILE_MIN_PAGE_PIXELS,
+            "target_pixels": settings.TILE_TARGET_PIXELS,
+            "overlap_ratio": settings.TILE_OVERLAP_RATIO,
+            "generation_config": TILE_GENERATION_CONFIG,
+        }
+    extraction_config = json.dumps(config, sort_keys=True)
+    
+    version_source = f"{prompt_hash}|{settings.GEMINI_MODEL_NAME}|{extraction_config}"
+    return {
+        "prompt_hash": prompt_hash,
+        "model_name": settings.GEMINI_MODEL_NAME,
+        "extraction_config": extraction_config,
+        "extraction_version": hashlib.sha256(version_source.encode("utf-8")).hexdigest()[:16],
+    }
+
+def get_current_extraction_versions(use_advanced_prompt: bool = False) -> List[str]:
+    """
+    Extraction versions whose results are up to date, the whole-page version first
+    
+    With tiling enabled, results of tiled pages carry the tiled version and small
+    pages (or pages that fell back to a whole-page extraction) the whole-page one.
+    """
+    versions = [get_extraction_stamp(use_advanced_prompt)["extraction_version"]]
+    if settings.TILED_EXTRACTION_ENABLED:
+        versions.append(get_extraction_stamp(use_advanced_prompt, tiled=True)["extraction_version"])
+    return versions
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(timeout=settings.GEMINI_REQUEST_TIMEOUT_SECONDS)
+    return _http_client
+
+async def _extract_with_rest_api(image_bytes: bytes, prompt_text: str, generation_config: Dict[str, Any]) -> List[Dict[str, str]]:
     """
     Use Gemini REST API for extraction (API Key approach)
     """
     # Convert image to base64
     base64_image = base64.b64encode(image_bytes).decode("utf-8")
     
-    # Select prompt based on parameter
-    prompt_text = ADVANCED_EXTRACTION_PROMPT if use_advanced_prompt else CHART_EXTRACTION_PROMPT
-    
     # API endpoint
-    url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-pro-vision:generateContent"
+    url = f"https://generativelanguage.googleapis.com/v1beta/models/{settings.GEMINI_MODEL_NAME}:generateContent"
     
     # Request payload
     payload = {
@@ -69,12 +147,7 @@ async def _extract_with_rest_api(image_bytes: bytes, use_advanced_prompt: bool =
                 ]
             }
         ],
-        "generation_config": {
-            "temperature": 0.4,
-            "top_p": 1,
-            "top_k": 32,
-            "max_output_tokens": 8192
-        }
+        "generation_config": generation_config
     }
     
     # Send request
@@ -83,7 +156,8 @@ async def _extract_with_rest_api(image_bytes: bytes, use_advanced_prompt: bool =
         "x-goog-api-key": settings.GEMINI_API_KEY
     }
     
-    response = requests.post(url, headers=headers, json=payload)
+    # Async request: cancelling a losing hedge closes its connection instead of leaving a thread running
+    response = await _get_http_client().post(url, headers=headers, json=payload)
     
     if response.status_code != 200:
         raise Exception(f"API request failed with status code {response.status_code}: {response.text}")
@@ -94,6 +168,67 @@ async def _extract_with_rest_api(image_bytes: bytes, use_advanced_prompt: bool =
     # Extract text from response
     text = response_data["candidates"][0]["content"]["parts"][0]["text"]
     
+    return _parse_extraction_response(text)
+
+async def _extract_with_vertex_ai(image_bytes: bytes, prompt_text: str, generation_config: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    Use Vertex AI for extraction (GCP Service Account approach)
+    """
+    try:
+        # Initialize Gemini model
+        model = GenerativeModel(settings.GEMINI_MODEL_NAME)
+        
+        # Create image part
+        image_part = Part.from_data(mime_type="image/jpeg", data=image_bytes)
+        
+        # Generate content
+        response = await model.generate_content_async([prompt_text, image_part], generation_config=generation_config)
+        
+        # Extract text from response
+        text = response.text
+        
+        return _parse_extraction_response(text)
+        
+    except Exception as e:
+        print(f"Vertex AI error: {e}")
+        raise e
+
+async def _extract_tiled(tiles: List[bytes]) -> Optional[List[Dict[str, str]]]:
+    """
+    Extract tiles of a page concurrently and merge them into the standard items
+    
+    Returns:
+        Merged items, or None if a tile still failed after one retry, in which
+        case the caller extracts the whole page instead
+    """
+    semaphore = asyncio.Semaphore(settings.TILE_MAX_CONCURRENCY)
+    # The page earns hedge budget once, like a whole-page call
+    _hedge_budget.on_call()
+    
+    async def extract_tile(index: int, tile: bytes) -> List[Dict[str, str]]:
+        async with semaphore:
+            try:
+                return await _tile_executor.call(tile, TILE_EXTRACTION_PROMPT, TILE_GENERATION_CONFIG)
+            except Exception as e:
+                # Retry only the failed tile rather than the whole page
+                print(f"Tile {index} extraction failed, retrying: {e}")
+                return await _tile_executor.call(tile, TILE_EXTRACTION_PROMPT, TILE_GENERATION_CONFIG)
+    
+    results = await asyncio.gather(
+        *(extract_tile(index, tile) for index, tile in enumerate(tiles)),
+        return_exceptions=True
+    )
+    for index, result in enumerate(results):
+        if isinstance(result, Exception):
+            print(f"Tile {index} extraction failed, falling back to full page: {result}")
+            return None
+    
+    return layout_service.merge_tile_results(results, CHART_ITEMS)
+
+def _parse_extraction_response(text: str) -> List[Dict[str, str]]:
+    """
+    Parse the JSON object in a model response into item_name/item_value pairs
+    """
     # Parse JSON from response text (the model might return additional text)
     try:
         # Try to find JSON in the response
@@ -115,52 +250,44 @@ async def _extract_with_rest_api(image_bytes: bytes, use_advanced_prompt: bool =
         print(f"Failed to parse JSON from response: {text}")
         raise e
 
-async def _extract_with_vertex_ai(image_bytes: bytes, use_advanced_prompt: bool = False) -> List[Dict[str, str]]:
+def _build_executors() -> Tuple[HedgeBudget, HedgedExecutor, HedgedExecutor]:
     """
-    Use Vertex AI for extraction (GCP Service Account approach)
+    Build the hedged executors over the configured backends
+
+    The backend selected by GEMINI_API_KEY stays the primary one. Vertex AI is
+    added as the alternate when a Google Cloud project is configured.
+
+    Tile calls are much shorter than whole-page calls, so they get their own
+    executor and latency trackers (and hence hedge deadlines). Both executors
+    share the circuit breakers and the hedge budget; tiled pages earn budget
+    once per page rather than once per tile.
     """
-    # Select prompt based on parameter
-    prompt_text = ADVANCED_EXTRACTION_PROMPT if use_advanced_prompt else CHART_EXTRACTION_PROMPT
+    backend_calls = []
+    if settings.GEMINI_API_KEY:
+        backend_calls.append(("rest", _extract_with_rest_api))
+    if not settings.GEMINI_API_KEY or settings.GOOGLE_CLOUD_PROJECT:
+        backend_calls.append(("vertex", _extract_with_vertex_ai))
     
-    try:
-        # Initialize Gemini model
-        model = GenerativeModel("gemini-2.5-pro-vision")
-        
-        # Create image part
-        image_part = Part.from_data(mime_type="image/jpeg", data=image_bytes)
-        
-        # Generate content
-        response = model.generate_content([prompt_text, image_part], generation_config={
-            "temperature": 0.4,
-            "top_p": 1,
-            "top_k": 32,
-            "max_output_tokens": 8192
-        })
-        
-        # Extract text from response
-        text = response.text
-        
-        # Parse JSON from response text
-        try:
-            # Try to find JSON in the response
-            json_start = text.find("{")
-            json_end = text.rfind("}") + 1
-            if json_start >= 0 and json_end > json_start:
-                json_text = text[json_start:json_end]
-                data = json.loads(json_text)
-            else:
-                raise ValueError("No JSON found in response")
-            
-            # Convert to expected output format
-            result = []
-            for key, value in data.items():
-                result.append({"item_name": key, "item_value": value})
-            
-            return result
-        except json.JSONDecodeError as e:
-            print(f"Failed to parse JSON from response: {text}")
-            raise e
-        
-    except Exception as e:
-        print(f"Vertex AI error: {e}")
-        raise e
+    breakers = {
+        name: CircuitBreaker(
+            failure_threshold=settings.GEMINI_CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=settings.GEMINI_CIRCUIT_RESET_SECONDS
+        )
+        for name, _ in backend_calls
+    }
+    budget = HedgeBudget(settings.GEMINI_HEDGE_BUDGET_RATIO)
+    
+    def build(earn_budget: bool) -> HedgedExecutor:
+        return HedgedExecutor(
+            [HedgeBackend(name=name, call=call, breaker=breakers[name]) for name, call in backend_calls],
+            budget,
+            percentile=settings.GEMINI_HEDGE_PERCENTILE,
+            initial_delay=settings.GEMINI_HEDGE_INITIAL_DELAY_SECONDS,
+            min_delay=settings.GEMINI_HEDGE_MIN_DELAY_SECONDS,
+            timeout=settings.GEMINI_REQUEST_TIMEOUT_SECONDS,
+            earn_budget=earn_budget
+        )
+    
+    return budget, build(earn_budget=True), build(earn_budget=False)
+
+_hedge_budget, _executor, _tile_executor = _build_executors()
@@ -0,0 +1,208 @@
+"""
+Request hedging and failover across interchangeable backends.
+
+A call is sent to the first healthy backend. If it has not answered by the
+backend's adaptive deadline (a percentile of its recent latencies), a second
+request is sent to the next backend and the first valid response wins; the
+slower request is cancelled. Hedges are paid for from a token budget that
+grows by a fixed ratio per call, which bounds the extra spend. Backends that
+keep failing are ejected by a circuit breaker until a cool-down has passed.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+
+class LatencyTracker:
+    """
+    Rolling window of call latencies
+
+    Attempts cancelled because another backend answered first are recorded with
+    their elapsed time as a lower bound; dropping them would leave only the fast
+    calls in the window and pull the hedge deadline down over time.
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._min_samples = min_samples
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the q-th percentile (0-1), or None until enough samples were recorded"""
+        if len(self._samples) < self._min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+        return ordered[index]
+
+
+class CircuitBreaker:
+    """Eject a backend after consecutive failures and probe it again after a cool-down"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        if self._opened_at is None:
+            return True
+        # Half-open: let a single probe through once the cool-down has passed
+        if not self._probe_in_flight and time.monotonic() - self._opened_at >= self._reset_timeout:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self._failures += 1
+        if self._probe_in_flight or self._failures >= self._failure_threshold:
+            self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+    def record_cancelled(self):
+        # A cancelled probe says nothing about backend health; allow another one
+        self._probe_in_flight = False
+
+
+class HedgeBudget:
+    """Token bucket limiting hedged requests to a fraction of all calls"""
+
+    def __init__(self, ratio: float, burst: float = 10.0):
+        self._ratio = max(ratio, 0.0)
+        self._burst = burst
+        self._tokens = 0.0
+
+    def on_call(self):
+        self._tokens = min(self._burst, self._tokens + self._ratio)
+
+    def try_spend(self) -> bool:
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        return False
+
+
+@dataclass
+class HedgeBackend:
+    name: str
+    call: Callable[..., Awaitable[Any]]
+    latency: LatencyTracker = field(default_factory=LatencyTracker)
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+
+
+class HedgedExecutor:
+    def __init__(
+        self,
+        backends: List[HedgeBackend],
+        budget: HedgeBudget,
+        percentile: float = 0.95,
+        initial_delay: float = 30.0,
+        min_delay: float = 1.0,
+        timeout: Optional[float] = None,
+        earn_budget: bool = True,
+    ):
+        self.backends = backends
+        self._budget = budget
+        # Executors sharing a budget with another one can leave earning to the caller
+        self._earn_budget = earn_budget
+        self._percentile = percentile
+        self._initial_delay = initial_delay
+        self._min_delay = min_delay
+        self._timeout = timeout
+
+    def hedge_delay(self, backend: HedgeBackend) -> float:
+        """Adaptive deadline after which a hedge is sent for a call to backend"""
+        observed = backend.latency.percentile(self._percentile)
+        if observed is None:
+            return self._initial_delay
+        return max(observed, self._min_delay)
+
+    async def _attempt(self, backend: HedgeBackend, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(backend.call(*args, **kwargs), timeout=self._timeout)
+        except asyncio.CancelledError:
+            backend.latency.record(time.monotonic() - started)
+            backend.breaker.record_cancelled()
+            raise
+        except Exception:
+            backend.breaker.record_failure()
+            raise
+        backend.latency.record(time.monotonic() - started)
+        backend.breaker.record_success()
+        return result
+
+    async def call(self, *args: Any, **kwargs: Any) -> Any:
+        """
+        Run the call on the healthy backends, hedging and failing over as needed
+
+        Returns:
+            Result of the first backend call that completed without raising
+        """
+        if self._earn_budget:
+            self._budget.on_call()
+
+        pending: Dict[asyncio.Task, HedgeBackend] = {}
+        errors: List[BaseException] = []
+        remaining = list(self.backends)
+
+        def launch_next() -> Optional[float]:
+            # Breakers are consulted lazily so a half-open probe is only taken when it is sent
+            while remaining:
+                backend = remaining.pop(0)
+                if backend.breaker.allow_request():
+                    task = asyncio.create_task(self._attempt(backend, args, kwargs))
+                    pending[task] = backend
+                    return self.hedge_delay(backend)
+            return None
+
+        deadline = launch_next()
+        if not pending:
+            # Every backend is ejected; still try the preferred one rather than fail outright
+            task = asyncio.create_task(self._attempt(self.backends[0], args, kwargs))
+            pending[task] = self.backends[0]
+
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=deadline if remaining else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+
+                if not done:
+                    # The deadline passed without a response: hedge if the budget allows
+                    if self._budget.try_spend():
+                        deadline = launch_next()
+                    else:
+                        deadline = None
+                    continue
+
+                for task in done:
+                    backend = pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+                    print(f"Backend {backend.name} failed: {error}")
+                    errors.append(error)
+
+                # Fail over straight away when nothing is left in flight
+                if not pending:
+                    deadline = launch_next()
+
+            raise errors[-1]
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,81 @@
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict
+
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+from app.services import object_storage
+
+# Derivative variant -> maximum width/height in pixels
+DERIVATIVE_SIZES = {
+    "thumbnail": settings.THUMBNAIL_MAX_SIZE,
+    "preview": settings.PREVIEW_MAX_SIZE,
+}
+DERIVATIVE_CONTENT_TYPE = "image/jpeg"
+
+# Pillow releases the GIL while decoding and resizing, so threads give real parallelism
+_executor = ThreadPoolExecutor(max_workers=settings.DERIVATIVE_WORKERS, thread_name_prefix="derivatives")
+
+def derivative_uri(gcs_uri: str, variant: str) -> str:
+    """
+    URI of a derivative image, stored next to the original
+    
+    Args:
+        gcs_uri: URI of the original chart image
+        variant: Derivative variant (thumbnail or preview)
+        
+    Returns:
+        URI of the derivative image
+    """
+    return object_storage.sibling_uri(gcs_uri, f"{variant}.jpg")
+
+def render_tag(variant: str) -> str:
+    """
+    Short hash of the settings a variant is rendered with, empty for the original
+    
+    Cached copies of a derivative are only valid for the settings it was rendered
+    with, so the tag is part of its ETag.
+    """
+    if variant not in DERIVATIVE_SIZES:
+        return ""
+    source = f"{DERIVATIVE_SIZES[variant]}|{settings.DERIVATIVE_JPEG_QUALITY}"
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:8]
+
+def _render_derivative(image_bytes: bytes, max_size: int) -> bytes:
+    with Image.open(BytesIO(image_bytes)) as image:
+        # Apply the EXIF orientation of phone photos before the metadata is dropped
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGB")
+        image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        
+        output = BytesIO()
+        image.save(output, format="JPEG", quality=settings.DERIVATIVE_JPEG_QUALITY, optimize=True, progressive=True)
+        return output.getvalue()
+
+async def generate_derivatives(gcs_uri: str, image_bytes: bytes) -> Dict[str, str]:
+    """
+    Render the thumbnail and preview of a chart image and store them next to the original
+    
+    Args:
+        gcs_uri: URI of the original chart image
+        image_bytes: Binary data of the original image
+        
+    Returns:
+        Dictionary mapping each variant to the URI it was stored at
+    """
+    loop = asyncio.get_running_loop()
+    variants = list(DERIVATIVE_SIZES)
+    rendered = await asyncio.gather(*(
+        loop.run_in_executor(_executor, _render_derivative, image_bytes, DERIVATIVE_SIZES[variant])
+        for variant in variants
+    ))
+    
+    cache_control = f"private, max-age={settings.IMAGE_CACHE_MAX_AGE_SECONDS}, immutable"
+    uris = {}
+    for variant, data in zip(variants, rendered):
+        uris[variant] = derivative_uri(gcs_uri, variant)
+        await object_storage.upload_bytes(uris[variant], data, DERIVATIVE_CONTENT_TYPE, cache_control)
+    return uris
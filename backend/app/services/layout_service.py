@@ -0,0 +1,139 @@
+import asyncio
+import math
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+
+UNREADABLE_MARKER = "判読不能"
+
+# Shortest text treated as repeated by the tile overlap; shorter matches (e.g.
+# "なし" within "特記事項なし") are as likely to be genuine separate values
+MIN_OVERLAP_CHARS = 8
+
+def plan_tile_grid(width: int, height: int) -> Tuple[int, int]:
+    """
+    Choose the number of tile rows and columns for a page
+    
+    Args:
+        width: Page width in pixels
+        height: Page height in pixels
+        
+    Returns:
+        (rows, columns); (1, 1) when the page is small enough to extract whole
+    """
+    if width * height <= settings.TILE_MIN_PAGE_PIXELS:
+        return 1, 1
+    
+    tile_count = math.ceil(width * height / settings.TILE_TARGET_PIXELS)
+    # Split along both axes in proportion to the aspect ratio so tiles stay roughly square
+    columns = max(1, round(math.sqrt(tile_count * width / height)))
+    rows = max(1, math.ceil(tile_count / columns))
+    return rows, columns
+
+def _tile_bounds(length: int, count: int, overlap: int) -> List[Tuple[int, int]]:
+    step = length / count
+    return [
+        (max(0, math.floor(i * step) - overlap), min(length, math.ceil((i + 1) * step) + overlap))
+        for i in range(count)
+    ]
+
+def _split_into_tiles(image_bytes: bytes) -> List[bytes]:
+    with Image.open(BytesIO(image_bytes)) as image:
+        image = ImageOps.exif_transpose(image)
+        width, height = image.size
+        rows, columns = plan_tile_grid(width, height)
+        if rows * columns == 1:
+            return []
+        
+        image = image.convert("RGB")
+        overlap_x = int(width / columns * settings.TILE_OVERLAP_RATIO / 2)
+        overlap_y = int(height / rows * settings.TILE_OVERLAP_RATIO / 2)
+        
+        # Row-major order, which is the reading order of the page
+        tiles = []
+        for top, bottom in _tile_bounds(height, rows, overlap_y):
+            for left, right in _tile_bounds(width, columns, overlap_x):
+                output = BytesIO()
+                image.crop((left, top, right, bottom)).save(output, format="JPEG", quality=90)
+                tiles.append(output.getvalue())
+        return tiles
+
+async def split_into_tiles(image_bytes: bytes) -> List[bytes]:
+    """
+    Split a large chart page into overlapping JPEG tiles
+    
+    Args:
+        image_bytes: Binary image data of the page
+        
+    Returns:
+        Tiles in reading order, or an empty list when the page is small enough
+        to be extracted in one call
+    """
+    return await asyncio.to_thread(_split_into_tiles, image_bytes)
+
+def merge_tile_results(tile_results: List[List[Dict[str, str]]], item_names: List[str]) -> List[Dict[str, str]]:
+    """
+    Merge per-tile items (in reading order) into one value per item
+    
+    Args:
+        tile_results: Extracted items of each tile, in tile reading order
+        item_names: Names of the items to return, in output order
+        
+    Returns:
+        List of dictionaries with item_name and item_value pairs
+    """
+    merged = []
+    for item_name in item_names:
+        values = []
+        for items in tile_results:
+            for item in items:
+                value = str(item["item_value"] or "").strip()
+                if item["item_name"] == item_name and value:
+                    values.append(value)
+        merged.append({"item_name": item_name, "item_value": merge_item_values(values)})
+    return merged
+
+def merge_item_values(values: List[str]) -> str:
+    """
+    Merge the values one item got from several tiles
+    
+    Readable values supersede the unreadable marker. Text repeated by the tile
+    overlap is removed: exact duplicates, and values of at least MIN_OVERLAP_CHARS
+    that are contained in another value. A value cut at a tile edge is joined with
+    the preceding one when they overlap by at least MIN_OVERLAP_CHARS. Everything
+    else is kept, one value per line.
+    """
+    # A tile that could not read an item is superseded by a tile that could
+    readable = [value for value in values if value.strip("「」") != UNREADABLE_MARKER]
+    if not readable:
+        return UNREADABLE_MARKER if values else ""
+    values = readable
+    
+    kept: List[str] = []
+    for value in values:
+        if any(value == existing or _is_overlap_fragment(value, existing) for existing in kept):
+            continue
+        kept = [existing for existing in kept if not _is_overlap_fragment(existing, value)]
+        
+        joined = _join_overlapping(kept[-1], value) if kept else None
+        if joined is not None:
+            kept[-1] = joined
+        else:
+            kept.append(value)
+    
+    return "\n".join(kept)
+
+def _is_overlap_fragment(value: str, other: str) -> bool:
+    return len(value) >= MIN_OVERLAP_CHARS and value != other and value in other
+
+def _join_overlapping(left: str, right: str) -> Optional[str]:
+    """
+    Join two fragments cut at a tile edge when the end of left repeats the start of right
+    """
+    for size in range(min(len(left), len(right)) - 1, MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return None
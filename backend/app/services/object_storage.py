@@ -0,0 +1,181 @@
+"""
+Object-level operations on stored chart images that go beyond the chart upload.
+
+Objects are addressed by gs://bucket/path URIs. With USE_MINIO set the same
+bucket and object names are used on the MinIO server through its S3 API;
+MinIO has no storage classes, so storage class changes are skipped there.
+"""
+import asyncio
+from datetime import timedelta
+from io import BytesIO
+from typing import Optional, Tuple
+
+from google.cloud import storage
+from minio import Minio
+from minio.error import S3Error
+
+from app.core.config import settings
+
+_client: Optional[storage.Client] = None
+_minio_clients = {}
+
+# MinIO ignores the region, but setting it keeps presigning from querying the server
+_MINIO_REGION = "us-east-1"
+
+
+def _get_client() -> storage.Client:
+    global _client
+    if _client is None:
+        _client = storage.Client()
+    return _client
+
+
+def _get_minio_client(endpoint: Optional[str] = None) -> Minio:
+    endpoint = endpoint or settings.MINIO_ENDPOINT
+    if endpoint not in _minio_clients:
+        _minio_clients[endpoint] = Minio(
+            endpoint,
+            access_key=settings.MINIO_ACCESS_KEY,
+            secret_key=settings.MINIO_SECRET_KEY,
+            secure=settings.MINIO_SECURE,
+            region=_MINIO_REGION,
+        )
+    return _minio_clients[endpoint]
+
+
+def parse_gcs_uri(gcs_uri: str) -> Tuple[str, str]:
+    """
+    Split a gs://bucket/path URI into bucket name and object name
+    """
+    if not gcs_uri.startswith("gs://"):
+        raise ValueError(f"Not a GCS URI: {gcs_uri}")
+    bucket_name, _, blob_name = gcs_uri[len("gs://"):].partition("/")
+    if not bucket_name or not blob_name:
+        raise ValueError(f"Not a GCS object URI: {gcs_uri}")
+    return bucket_name, blob_name
+
+
+async def set_storage_class(gcs_uri: str, storage_class: str) -> bool:
+    """
+    Move a stored object to another storage class (e.g. NEARLINE, COLDLINE, ARCHIVE)
+
+    Args:
+        gcs_uri: URI of the object
+        storage_class: Target GCS storage class
+
+    Returns:
+        True if the object was rewritten, False if it was missing, already in the
+        target class, or storage classes are not supported
+    """
+    if settings.USE_MINIO:
+        return False
+
+    bucket_name, blob_name = parse_gcs_uri(gcs_uri)
+
+    def _update() -> bool:
+        blob = _get_client().bucket(bucket_name).get_blob(blob_name)
+        if blob is None or blob.storage_class == storage_class:
+            return False
+        blob.update_storage_class(storage_class)
+        return True
+
+    return await asyncio.to_thread(_update)
+
+
+def sibling_uri(gcs_uri: str, suffix: str) -> str:
+    """
+    Build the URI of an object stored next to another one, e.g. image.png -> image.thumbnail.jpg
+    """
+    directory, _, filename = gcs_uri.rpartition("/")
+    stem = filename.rsplit(".", 1)[0] if "." in filename else filename
+    return f"{directory}/{stem}.{suffix}"
+
+
+async def upload_bytes(gcs_uri: str, data: bytes, content_type: str, cache_control: Optional[str] = None):
+    """
+    Upload raw bytes to a storage URI
+    """
+    bucket_name, blob_name = parse_gcs_uri(gcs_uri)
+
+    def _upload():
+        if settings.USE_MINIO:
+            headers = {"Cache-Control": cache_control} if cache_control else None
+            _get_minio_client().put_object(
+                bucket_name, blob_name, BytesIO(data), len(data),
+                content_type=content_type, metadata=headers
+            )
+            return
+        blob = _get_client().bucket(bucket_name).blob(blob_name)
+        blob.cache_control = cache_control
+        blob.upload_from_string(data, content_type=content_type)
+
+    await asyncio.to_thread(_upload)
+
+
+async def get_object_size(gcs_uri: str) -> Optional[int]:
+    """
+    Size of a stored object in bytes, or None if it does not exist
+    """
+    bucket_name, blob_name = parse_gcs_uri(gcs_uri)
+
+    def _stat() -> Optional[int]:
+        if settings.USE_MINIO:
+            try:
+                return _get_minio_client().stat_object(bucket_name, blob_name).size
+            except S3Error as e:
+                if e.code == "NoSuchKey":
+                    return None
+                raise
+        blob = _get_client().bucket(bucket_name).get_blob(blob_name)
+        return blob.size if blob is not None else None
+
+    return await asyncio.to_thread(_stat)
+
+
+async def download_range(gcs_uri: str, start: int, end: int) -> bytes:
+    """
+    Download part of a stored object
+
+    Args:
+        gcs_uri: URI of the object
+        start: Offset of the first byte
+        end: Offset of the last byte (inclusive)
+
+    Returns:
+        Bytes start to end of the object
+    """
+    bucket_name, blob_name = parse_gcs_uri(gcs_uri)
+
+    def _download() -> bytes:
+        if settings.USE_MINIO:
+            response = _get_minio_client().get_object(bucket_name, blob_name, offset=start, length=end - start + 1)
+            try:
+                return response.read()
+            finally:
+                response.close()
+                response.release_conn()
+        blob = _get_client().bucket(bucket_name).blob(blob_name)
+        return blob.download_as_bytes(start=start, end=end)
+
+    return await asyncio.to_thread(_download)
+
+
+async def generate_signed_url(gcs_uri: str, expiration_seconds: int) -> str:
+    """
+    Create a short-lived signed URL allowing a client to GET the object directly
+    """
+    bucket_name, blob_name = parse_gcs_uri(gcs_uri)
+
+    def _sign() -> str:
+        if settings.USE_MINIO:
+            # Sign for the host clients use; the signature covers the Host header
+            client = _get_minio_client(settings.MINIO_PUBLIC_ENDPOINT or settings.MINIO_ENDPOINT)
+            return client.presigned_get_object(bucket_name, blob_name, expires=timedelta(seconds=expiration_seconds))
+        blob = _get_client().bucket(bucket_name).blob(blob_name)
+        return blob.generate_signed_url(
+            version="v4",
+            expiration=timedelta(seconds=expiration_seconds),
+            method="GET"
+        )
+
+    return await asyncio.to_thread(_sign)
@@ -0,0 +1,36 @@
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.services import image_service, db_service
+import traceback
+
+async def run_derivative_task(chart_id: str, gcs_uri: str, image_bytes: bytes, db_url: str):
+    """
+    Background task to generate the thumbnail and preview of an uploaded chart
+    
+    Args:
+        chart_id: ID of the chart
+        gcs_uri: URI of the original image in storage
+        image_bytes: Binary data of the uploaded image
+        db_url: Database URL for creating a new session
+    """
+    # Convert URL to async format if needed
+    if db_url.startswith('postgresql://') and not db_url.startswith('postgresql+asyncpg://'):
+        db_url = db_url.replace('postgresql://', 'postgresql+asyncpg://')
+    elif db_url.startswith('sqlite://') and not db_url.startswith('sqlite+aiosqlite://'):
+        db_url = db_url.replace('sqlite://', 'sqlite+aiosqlite://')
+    
+    try:
+        await image_service.generate_derivatives(gcs_uri, image_bytes)
+    except Exception as e:
+        # Derivatives are optional; clients fall back to the original image
+        print(f"Error generating derivatives for chart {chart_id}: {str(e)}")
+        print(traceback.format_exc())
+        return
+    
+    engine = create_async_engine(db_url)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with async_session() as session:
+            await db_service.mark_derivatives_ready(session, chart_id)
+    finally:
+        await engine.dispose()
@@ -0,0 +1,26 @@
+import asyncio
+from datetime import datetime, timezone
+
+from app.core.config import settings
+from app.db.session import engine, AsyncSessionLocal
+from app.db.partitioning import add_months, ensure_monthly_partitions, month_start
+from app.services import archive_service
+
+async def run_partition_maintenance():
+    """
+    Create upcoming monthly partitions and archive the ones past the retention window
+    
+    Intended to run daily, e.g. from cron: python -m app.tasks.maintain_partitions
+    """
+    async with engine.begin() as conn:
+        await ensure_monthly_partitions(conn, settings.PARTITION_PREMAKE_MONTHS)
+    
+    archive_before = add_months(month_start(datetime.now(timezone.utc)), -settings.ARCHIVE_AFTER_MONTHS)
+    async with AsyncSessionLocal() as session:
+        archived = await archive_service.archive_partitions(session, archive_before)
+    
+    for name in archived:
+        print(f"Archived partition {name}")
+
+if __name__ == "__main__":
+    asyncio.run(run_partition_maintenance())
@@ -4,6 +4,8 @@ from sqlalchemy.orm import sessionmaker
 from app.services import gcs_service, gemini_service, db_service
 from app.db.models import ProcessStatus
 from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.tasks.scheduler import extraction_scheduler
 import traceback
 
 async def run_extraction_task(chart_id: str, gcs_uri: str, db_url: str):
@@ -39,10 +41,12 @@ async def run_extraction_task(chart_id: str, gcs_uri: str, db_url: str):
             image_bytes = await gcs_service.get_file_from_gcs(gcs_uri)
             
             # Extract data using Gemini API
-            extracted_data = await gemini_service.extract_chart_data(image_bytes)
+            extracted_data, extraction_stamp = await gemini_service.extract_chart_data(image_bytes)
             
-            # Save extracted data to database
-            await db_service.create_extracted_data_records(session, chart_id, extracted_data)
+            # Save extracted data to database, stamped with the prompt/model version
+            await db_service.create_extracted_data_records(
+                session, chart_id, extracted_data, extraction_stamp
+            )
             
             # Update chart status to completed
             await db_service.update_chart_status(
@@ -63,3 +67,26 @@ async def run_extraction_task(chart_id: str, gcs_uri: str, db_url: str):
                 ProcessStatus.FAILED.value, 
                 str(e)
             )
+
+async def resubmit_unfinished_charts(db_url: str) -> int:
+    """
+    Queue the extraction of charts left unfinished by a previous run
+    
+    The scheduler queue only lives in this process, so charts still pending (or
+    interrupted while processing) when the service stopped are submitted again
+    with their stored scheduling class and tenant.
+    
+    Args:
+        db_url: Database URL passed on to the extraction tasks
+        
+    Returns:
+        Number of charts submitted
+    """
+    async with AsyncSessionLocal() as session:
+        charts = await db_service.get_unfinished_charts(session)
+    
+    for chart in charts:
+        extraction_scheduler.submit(
+            chart.scheduling_class, chart.tenant_id, run_extraction_task, chart.id, chart.gcs_uri, db_url
+        )
+    return len(charts)
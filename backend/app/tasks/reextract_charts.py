@@ -0,0 +1,158 @@
+import asyncio
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.services import gcs_service, gemini_service, db_service
+from app.db.models import ProcessStatus, SchedulingClass
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.tasks.scheduler import extraction_scheduler
+import traceback
+
+# Re-extraction work is accounted to its own tenant so the per-tenant cap throttles it
+REEXTRACTION_TENANT_ID = "reextraction"
+
+async def reextract_chart(chart_id: str, gcs_uri: str, async_session: sessionmaker):
+    """
+    Re-extract one chart from its stored image and make the new results current
+    
+    The chart status is left untouched, so the previous results stay visible
+    until the new set is committed.
+    """
+    image_bytes = await gcs_service.get_file_from_gcs(gcs_uri)
+    extracted_data, extraction_stamp = await gemini_service.extract_chart_data(image_bytes)
+    
+    async with async_session() as session:
+        await db_service.create_extracted_data_records(session, chart_id, extracted_data, extraction_stamp)
+
+async def _renew_lease(job_id: str, async_session: sessionmaker):
+    """Keep the job lease fresh while a chunk is being processed"""
+    while True:
+        await asyncio.sleep(settings.REEXTRACTION_LEASE_SECONDS / 3)
+        async with async_session() as session:
+            await db_service.renew_reextraction_job_lease(session, job_id)
+
+async def _reextract_chunk(charts, async_session: sessionmaker) -> int:
+    """Re-extract a chunk of charts through the bulk scheduling lane and return the number that failed"""
+    results = await asyncio.gather(
+        *(
+            extraction_scheduler.submit(
+                SchedulingClass.BULK.value,
+                REEXTRACTION_TENANT_ID,
+                reextract_chart,
+                chart.id,
+                chart.gcs_uri,
+                async_session
+            )
+            for chart in charts
+        ),
+        return_exceptions=True
+    )
+    
+    failed = 0
+    for chart, result in zip(charts, results):
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"Error re-extracting chart {chart.id}: {str(result)}")
+    return failed
+
+async def run_reextraction_job(job_id: str, db_url: str):
+    """
+    Background task re-extracting all stale charts of a re-extraction job
+    
+    Charts are processed one stale extraction version at a time, in chunks in
+    chart ID order, through the bulk lane of the extraction scheduler. Progress
+    and the last processed version and chart ID are saved after every chunk, so
+    an interrupted job resumes where it stopped.
+    The job must have been claimed with db_service.claim_reextraction_job; its
+    lease is renewed in the background while it runs.
+    
+    Args:
+        job_id: ID of the claimed re-extraction job
+        db_url: Database URL for creating a new session
+    """
+    # Convert URL to async format if needed
+    if db_url.startswith('postgresql://') and not db_url.startswith('postgresql+asyncpg://'):
+        db_url = db_url.replace('postgresql://', 'postgresql+asyncpg://')
+    elif db_url.startswith('sqlite://') and not db_url.startswith('sqlite+aiosqlite://'):
+        db_url = db_url.replace('sqlite://', 'sqlite+aiosqlite://')
+    
+    engine = create_async_engine(db_url)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    lease = asyncio.create_task(_renew_lease(job_id, async_session))
+    current_versions = gemini_service.get_current_extraction_versions()
+    
+    try:
+        async with async_session() as session:
+            job = await db_service.get_reextraction_job(session, job_id)
+            
+            stale_versions = await db_service.get_stale_versions(session, current_versions)
+            for version in stale_versions:
+                # Versions before the saved position were finished by an earlier run
+                if db_service.stale_version_order(version) < db_service.stale_version_order(job.last_extraction_version):
+                    continue
+                after_chart_id = job.last_chart_id if version == job.last_extraction_version else None
+                
+                while True:
+                    charts = await db_service.get_stale_charts(
+                        session, version, after_chart_id, settings.REEXTRACTION_CHUNK_SIZE
+                    )
+                    if not charts:
+                        break
+                    
+                    failed = await _reextract_chunk(charts, async_session)
+                    after_chart_id = charts[-1].id
+                    
+                    # Failed charts stay stale and are picked up by the next job
+                    job = await db_service.update_reextraction_job(
+                        session,
+                        job_id,
+                        last_extraction_version=version,
+                        last_chart_id=after_chart_id,
+                        processed_charts=job.processed_charts + len(charts) - failed,
+                        failed_charts=job.failed_charts + failed
+                    )
+                    
+                    await asyncio.sleep(settings.REEXTRACTION_CHUNK_DELAY_SECONDS)
+            
+            await db_service.update_reextraction_job(session, job_id, status=ProcessStatus.COMPLETED.value)
+    
+    except Exception as e:
+        print(f"Error running re-extraction job {job_id}: {str(e)}")
+        print(traceback.format_exc())
+        
+        async with async_session() as session:
+            await db_service.update_reextraction_job(
+                session, job_id, status=ProcessStatus.FAILED.value, error_message=str(e)
+            )
+    finally:
+        lease.cancel()
+        await asyncio.gather(lease, return_exceptions=True)
+        await engine.dispose()
+
+async def start_or_resume_reextraction(db_url: str = settings.DATABASE_URL):
+    """
+    Resume the unfinished re-extraction job for the current extraction version, or start one
+    
+    Intended to be scheduled, e.g. from cron: python -m app.tasks.reextract_charts
+    A job whose lease (REEXTRACTION_LEASE_SECONDS) is held by another runner is
+    left alone.
+    """
+    current_versions = gemini_service.get_current_extraction_versions()
+    target_version = current_versions[0]
+    
+    async with AsyncSessionLocal() as session:
+        job = await db_service.get_unfinished_reextraction_job(session, target_version)
+        if job is None and not await db_service.count_stale_charts(session, current_versions):
+            print(f"All charts are at extraction version {', '.join(current_versions)}")
+            return
+        
+        job = await db_service.get_or_create_reextraction_job(session, target_version, current_versions)
+        if await db_service.claim_reextraction_job(session, job.id, settings.REEXTRACTION_LEASE_SECONDS) is None:
+            print(f"Re-extraction job {job.id} is already running")
+            return
+    
+    print(f"Running re-extraction job {job.id} for extraction version {target_version}")
+    await run_reextraction_job(job.id, db_url)
+
+if __name__ == "__main__":
+    asyncio.run(start_or_resume_reextraction())
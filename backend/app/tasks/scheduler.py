@@ -0,0 +1,183 @@
+"""
+Weighted fair scheduler for chart extraction work.
+
+Jobs are queued per scheduling class and dispatched using self-clocked fair
+queuing: each job gets a virtual finish tag of ``start + 1 / weight`` and the
+eligible job with the smallest tag runs next. A large bulk backfill therefore
+only receives its weighted share of the extraction slots, while interactive
+uploads skip ahead of it. While other work is waiting, each tenant is capped
+to a fixed number of concurrent jobs per scheduling class, so a tenant's own
+bulk work cannot hold back its interactive uploads; idle capacity is still
+used by whoever has work queued. A few slots are kept free for interactive
+work.
+"""
+import asyncio
+import itertools
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.db.models import SchedulingClass
+
+
+@dataclass
+class _Job:
+    finish_tag: float
+    seq: int
+    scheduling_class: str
+    tenant_id: str
+    func: Callable[..., Awaitable[Any]]
+    args: Tuple[Any, ...]
+    future: asyncio.Future
+
+
+class ExtractionScheduler:
+    def __init__(
+        self,
+        weights: Dict[str, int],
+        max_concurrency: int,
+        reserved_interactive_slots: int,
+        max_concurrency_per_tenant: int,
+    ):
+        self._weights = weights
+        self._max_concurrency = max(max_concurrency, 1)
+        self._max_background = max(self._max_concurrency - reserved_interactive_slots, 1)
+        self._max_per_tenant = max(max_concurrency_per_tenant, 1)
+
+        # scheduling class -> tenant -> FIFO queue of jobs
+        self._queues: Dict[str, Dict[str, Deque[_Job]]] = {}
+        self._last_finish: Dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+
+        self._running = 0
+        self._running_background = 0
+        # (tenant, scheduling class) -> running jobs
+        self._running_by_tenant: Dict[Tuple[str, str], int] = {}
+        self._tasks = set()
+
+    def submit(
+        self,
+        scheduling_class: str,
+        tenant_id: Optional[str],
+        func: Callable[..., Awaitable[Any]],
+        *args: Any,
+    ) -> asyncio.Future:
+        """
+        Queue a coroutine function for execution
+
+        Args:
+            scheduling_class: Scheduling class of the job (e.g. interactive, bulk)
+            tenant_id: Tenant the job is accounted to for the per-class concurrency cap
+            func: Coroutine function to run
+            *args: Positional arguments passed to func
+
+        Returns:
+            Future resolved with the result of func once it has run
+        """
+        weight = max(self._weights.get(scheduling_class, 1), 1)
+        start_tag = max(self._virtual_time, self._last_finish.get(scheduling_class, 0.0))
+        finish_tag = start_tag + 1.0 / weight
+        self._last_finish[scheduling_class] = finish_tag
+
+        job = _Job(
+            finish_tag=finish_tag,
+            seq=next(self._seq),
+            scheduling_class=scheduling_class,
+            tenant_id=tenant_id or "",
+            func=func,
+            args=args,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        tenant_queues = self._queues.setdefault(scheduling_class, {})
+        tenant_queues.setdefault(job.tenant_id, deque()).append(job)
+
+        self._dispatch()
+        return job.future
+
+    def queued_count(self, scheduling_class: Optional[str] = None) -> int:
+        """Number of jobs waiting to be dispatched, optionally for one scheduling class"""
+        classes = [scheduling_class] if scheduling_class else list(self._queues)
+        return sum(
+            len(queue)
+            for name in classes
+            for queue in self._queues.get(name, {}).values()
+        )
+
+    def _is_background(self, scheduling_class: str) -> bool:
+        return scheduling_class != SchedulingClass.INTERACTIVE.value
+
+    def _next_job(self) -> Optional[_Job]:
+        best: Optional[_Job] = None
+        best_over_cap: Optional[_Job] = None
+        background_full = self._running_background >= self._max_background
+
+        for scheduling_class, tenant_queues in self._queues.items():
+            if background_full and self._is_background(scheduling_class):
+                continue
+            for tenant_id, queue in tenant_queues.items():
+                if not queue:
+                    continue
+                head = queue[0]
+                if self._running_by_tenant.get((tenant_id, scheduling_class), 0) >= self._max_per_tenant:
+                    if best_over_cap is None or (head.finish_tag, head.seq) < (best_over_cap.finish_tag, best_over_cap.seq):
+                        best_over_cap = head
+                elif best is None or (head.finish_tag, head.seq) < (best.finish_tag, best.seq):
+                    best = head
+
+        # The tenant cap only holds back work while another tenant or class is waiting;
+        # otherwise a tenant over its cap uses the idle capacity
+        best = best or best_over_cap
+        if best is not None:
+            tenant_queues = self._queues[best.scheduling_class]
+            tenant_queues[best.tenant_id].popleft()
+            if not tenant_queues[best.tenant_id]:
+                del tenant_queues[best.tenant_id]
+            self._virtual_time = best.finish_tag
+        return best
+
+    def _dispatch(self):
+        while self._running < self._max_concurrency:
+            job = self._next_job()
+            if job is None:
+                break
+            self._start(job)
+
+    def _start(self, job: _Job):
+        self._running += 1
+        if self._is_background(job.scheduling_class):
+            self._running_background += 1
+        key = (job.tenant_id, job.scheduling_class)
+        self._running_by_tenant[key] = self._running_by_tenant.get(key, 0) + 1
+
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: _Job):
+        try:
+            result = await job.func(*job.args)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._running -= 1
+            if self._is_background(job.scheduling_class):
+                self._running_background -= 1
+            key = (job.tenant_id, job.scheduling_class)
+            self._running_by_tenant[key] -= 1
+            if not self._running_by_tenant[key]:
+                del self._running_by_tenant[key]
+            self._dispatch()
+
+
+extraction_scheduler = ExtractionScheduler(
+    weights=settings.SCHEDULING_CLASS_WEIGHTS,
+    max_concurrency=settings.EXTRACTION_MAX_CONCURRENCY,
+    reserved_interactive_slots=settings.EXTRACTION_RESERVED_INTERACTIVE_SLOTS,
+    max_concurrency_per_tenant=settings.EXTRACTION_MAX_CONCURRENCY_PER_TENANT,
+)
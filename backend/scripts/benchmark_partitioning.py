@@ -0,0 +1,176 @@
+"""
+Benchmark insert and lookup latency of the partitioned layout against the flat one.
+
+Both layouts are created in their own schema of a PostgreSQL database, filled
+with synthetic charts spread over several months (8 extracted items per chart),
+and then timed for single-chart inserts and lookups by chart ID.
+
+Usage:
+    python scripts/benchmark_partitioning.py --database-url postgresql://... --rows 50000000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+ITEMS = ["主訴", "現病歴", "既往歴", "家族歴", "身体所見", "検査所見", "診断", "治療計画"]
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+LOAD_CHUNK_CHARTS = 500_000
+
+FLAT_DDL = [
+    "CREATE TABLE {schema}.charts (id varchar PRIMARY KEY, gcs_uri varchar NOT NULL, "
+    "upload_timestamp timestamptz NOT NULL, status varchar NOT NULL)",
+    "CREATE TABLE {schema}.extracted_data (id bigserial PRIMARY KEY, "
+    "chart_id varchar NOT NULL REFERENCES {schema}.charts (id), chart_upload_timestamp timestamptz NOT NULL, "
+    "item_name varchar NOT NULL, item_value text, extracted_timestamp timestamptz NOT NULL DEFAULT now())",
+]
+
+PARTITIONED_DDL = [
+    "CREATE TABLE {schema}.charts (id varchar NOT NULL, gcs_uri varchar NOT NULL, "
+    "upload_timestamp timestamptz NOT NULL, status varchar NOT NULL, PRIMARY KEY (id, upload_timestamp)) "
+    "PARTITION BY RANGE (upload_timestamp)",
+    "CREATE TABLE {schema}.extracted_data (id bigserial NOT NULL, chart_id varchar NOT NULL, "
+    "chart_upload_timestamp timestamptz NOT NULL, item_name varchar NOT NULL, item_value text, "
+    "extracted_timestamp timestamptz NOT NULL DEFAULT now(), PRIMARY KEY (id, chart_upload_timestamp), "
+    "FOREIGN KEY (chart_id, chart_upload_timestamp) REFERENCES {schema}.charts (id, upload_timestamp)) "
+    "PARTITION BY RANGE (chart_upload_timestamp)",
+]
+
+INDEX_DDL = [
+    "CREATE INDEX ON {schema}.extracted_data (chart_id)",
+    "CREATE INDEX ON {schema}.extracted_data (item_name)",
+]
+
+
+def _month(index: int) -> datetime:
+    index += START.year * 12 + START.month - 1
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def _percentiles(samples):
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(ordered) * 1000, 2),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1] * 1000, 2),
+        "p99_ms": round(ordered[int(len(ordered) * 0.99) - 1] * 1000, 2),
+    }
+
+
+async def _create_layout(conn, schema: str, partitioned: bool, months: int):
+    await conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+    await conn.execute(text(f"CREATE SCHEMA {schema}"))
+    for ddl in (PARTITIONED_DDL if partitioned else FLAT_DDL) + INDEX_DDL:
+        await conn.execute(text(ddl.format(schema=schema)))
+    if partitioned:
+        # One extra month so the insert benchmark has a current partition
+        for offset in range(months + 1):
+            lower, upper = _month(offset), _month(offset + 1)
+            for table in ("charts", "extracted_data"):
+                await conn.execute(text(
+                    f"CREATE TABLE {schema}.{table}_y{lower.year:04d}m{lower.month:02d} "
+                    f"PARTITION OF {schema}.{table} "
+                    f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+                ))
+
+
+async def _load(engine, schema: str, charts: int, months: int):
+    seconds_per_chart = (_month(months) - START).total_seconds() / charts
+    for first in range(1, charts + 1, LOAD_CHUNK_CHARTS):
+        last = min(first + LOAD_CHUNK_CHARTS - 1, charts)
+        async with engine.begin() as conn:
+            await conn.execute(text(
+                f"INSERT INTO {schema}.charts (id, gcs_uri, upload_timestamp, status) "
+                f"SELECT 'chart-' || g, 'gs://bench/' || g, "
+                f"timestamptz '{START.isoformat()}' + (g * {seconds_per_chart}) * interval '1 second', 'completed' "
+                f"FROM generate_series({first}, {last}) g"
+            ))
+            await conn.execute(text(
+                f"INSERT INTO {schema}.extracted_data (chart_id, chart_upload_timestamp, item_name, item_value) "
+                f"SELECT c.id, c.upload_timestamp, item, repeat('x', 200) "
+                f"FROM {schema}.charts c CROSS JOIN unnest(:items ::varchar[]) item "
+                f"WHERE c.id IN (SELECT 'chart-' || g FROM generate_series({first}, {last}) g)"
+            ), {"items": ITEMS})
+    async with engine.begin() as conn:
+        await conn.execute(text(f"ANALYZE {schema}.charts"))
+        await conn.execute(text(f"ANALYZE {schema}.extracted_data"))
+
+
+async def _bench_inserts(engine, schema: str, count: int, months: int):
+    timestamp = _month(months)
+    run = int(time.time())
+    samples = []
+    for n in range(count):
+        chart_id = f"bench-insert-{run}-{n}"
+        started = time.perf_counter()
+        async with engine.begin() as conn:
+            await conn.execute(text(
+                f"INSERT INTO {schema}.charts (id, gcs_uri, upload_timestamp, status) "
+                f"VALUES (:id, 'gs://bench/new', :ts, 'completed')"
+            ), {"id": chart_id, "ts": timestamp})
+            await conn.execute(text(
+                f"INSERT INTO {schema}.extracted_data (chart_id, chart_upload_timestamp, item_name, item_value) "
+                f"SELECT :id, :ts, item, repeat('x', 200) FROM unnest(:items ::varchar[]) item"
+            ), {"id": chart_id, "ts": timestamp, "items": ITEMS})
+        samples.append(time.perf_counter() - started)
+    return _percentiles(samples)
+
+
+async def _bench_lookups(engine, schema: str, count: int, charts: int, months: int, partitioned: bool):
+    seconds_per_chart = (_month(months) - START).total_seconds() / charts
+    samples = []
+    async with engine.connect() as conn:
+        for _ in range(count):
+            n = random.randint(1, charts)
+            timestamp = START.timestamp() + n * seconds_per_chart
+            uploaded = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+            lower = datetime(uploaded.year, uploaded.month, 1, tzinfo=timezone.utc)
+            params = {"id": f"chart-{n}", "lower": lower, "upper": _month((lower.year - START.year) * 12 + lower.month)}
+            # The partitioned layout knows the upload month from the chart ID
+            chart_filter = "id = :id"
+            item_filter = "chart_id = :id"
+            if partitioned:
+                chart_filter += " AND upload_timestamp >= :lower AND upload_timestamp < :upper"
+                item_filter += " AND chart_upload_timestamp >= :lower AND chart_upload_timestamp < :upper"
+
+            started = time.perf_counter()
+            await conn.execute(text(f"SELECT * FROM {schema}.charts WHERE {chart_filter}"), params)
+            await conn.execute(text(f"SELECT * FROM {schema}.extracted_data WHERE {item_filter}"), params)
+            samples.append(time.perf_counter() - started)
+    return _percentiles(samples)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--rows", type=int, default=50_000_000, help="extracted_data rows to load")
+    parser.add_argument("--months", type=int, default=24, help="months the synthetic uploads are spread over")
+    parser.add_argument("--inserts", type=int, default=1000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--skip-load", action="store_true", help="reuse previously loaded schemas")
+    args = parser.parse_args()
+
+    database_url = args.database_url.replace("postgresql://", "postgresql+asyncpg://")
+    engine = create_async_engine(database_url)
+    charts = args.rows // len(ITEMS)
+
+    for schema, partitioned in (("bench_flat", False), ("bench_partitioned", True)):
+        if not args.skip_load:
+            async with engine.begin() as conn:
+                await _create_layout(conn, schema, partitioned, args.months)
+            started = time.perf_counter()
+            await _load(engine, schema, charts, args.months)
+            print(f"{schema}: loaded {charts * len(ITEMS)} rows in {time.perf_counter() - started:.0f}s")
+
+        print(f"{schema}: insert {await _bench_inserts(engine, schema, args.inserts, args.months)}")
+        print(f"{schema}: lookup {await _bench_lookups(engine, schema, args.lookups, charts, args.months, partitioned)}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+import asyncio
+import sqlite3
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.partitioning import new_chart_id
+from app.db.session import Base
+from app.services import db_service
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+LEGACY_SCHEMA = """
+CREATE TABLE charts (
+    id VARCHAR NOT NULL, original_filename VARCHAR, gcs_uri VARCHAR NOT NULL, content_type VARCHAR,
+    upload_timestamp DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL, status VARCHAR NOT NULL,
+    error_message TEXT, PRIMARY KEY (id)
+);
+CREATE TABLE extracted_data (
+    id INTEGER NOT NULL, chart_id VARCHAR NOT NULL, item_name VARCHAR NOT NULL, item_value TEXT,
+    extracted_timestamp DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL,
+    PRIMARY KEY (id), FOREIGN KEY(chart_id) REFERENCES charts (id)
+);
+CREATE INDEX ix_extracted_data_chart_id ON extracted_data (chart_id);
+CREATE INDEX ix_extracted_data_item_name ON extracted_data (item_name);
+INSERT INTO charts VALUES ('legacy', 'a.png', 'gs://bucket/legacy.png', 'image/png', '2025-03-04 10:00:00', 'completed', NULL);
+INSERT INTO extracted_data VALUES (7, 'legacy', '主訴', '頭痛', '2025-03-04 10:01:00');
+"""
+
+STAMP = {"extraction_version": "v1", "prompt_hash": "p", "model_name": "m", "extraction_config": "{}"}
+
+
+async def _store_results(db_url: str, create_schema: bool):
+    engine = create_async_engine(db_url)
+    if create_schema:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    try:
+        chart_id = new_chart_id()
+        async with async_session() as session:
+            await db_service.create_chart_record(session, chart_id, "b.png", "gs://bucket/b.png", "image/png")
+            records = await db_service.create_extracted_data_records(
+                session, chart_id, [{"item_name": "主訴", "item_value": "腹痛"}], STAMP
+            )
+            assert all(record.id is not None for record in records)
+
+            chart = await db_service.get_chart_with_extracted_data(session, chart_id)
+            assert chart.extraction_version == "v1"
+            assert [(d.item_name, d.item_value) for d in chart.current_extracted_data] == [("主訴", "腹痛")]
+    finally:
+        await engine.dispose()
+
+
+def test_extracted_data_is_stored_on_sqlite():
+    asyncio.run(_store_results("sqlite+aiosqlite://", create_schema=True))
+
+
+def test_extracted_data_is_stored_after_migration(tmp_path):
+    db_path = tmp_path / "legacy.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript(LEGACY_SCHEMA)
+
+    config = Config()
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    config.set_main_option("sqlalchemy.url", f"sqlite+aiosqlite:///{db_path}")
+    command.upgrade(config, "head")
+
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT id, extraction_version FROM extracted_data").fetchall() == [(7, "legacy")]
+
+    asyncio.run(_store_results(f"sqlite+aiosqlite:///{db_path}", create_schema=False))
+
+    with sqlite3.connect(db_path) as conn:
+        ids = [row[0] for row in conn.execute("SELECT id FROM extracted_data ORDER BY id")]
+    assert ids[0] == 7 and ids[1] > 7
+
+
+def test_rolled_back_version_replaces_its_earlier_result_set():
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        chart_id = new_chart_id()
+        async with async_session() as session:
+            await db_service.create_chart_record(session, chart_id, "b.png", "gs://bucket/b.png", "image/png")
+            for version, value in [("A", "1"), ("B", "2"), ("A", "3")]:
+                await db_service.create_extracted_data_records(
+                    session, chart_id, [{"item_name": "主訴", "item_value": value}], {**STAMP, "extraction_version": version}
+                )
+
+        async with async_session() as session:
+            chart = await db_service.get_chart_with_extracted_data(session, chart_id)
+            assert [(d.item_name, d.item_value) for d in chart.current_extracted_data] == [("主訴", "3")]
+            assert sorted(d.extraction_version for d in chart.extracted_data) == ["A", "B"]
+        await engine.dispose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from app.services.hedging import CircuitBreaker, HedgeBackend, HedgeBudget, HedgedExecutor
+
+
+def _backend(name, delay=0.0, error=None, breaker=None):
+    calls = []
+
+    async def call(value):
+        calls.append(value)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return f"{name}:{value}"
+
+    backend = HedgeBackend(name=name, call=call)
+    if breaker is not None:
+        backend.breaker = breaker
+    return backend, calls
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    async def scenario():
+        primary, _ = _backend("primary", delay=1.0)
+        secondary, _ = _backend("secondary")
+        executor = HedgedExecutor([primary, secondary], HedgeBudget(ratio=1.0), initial_delay=0.05)
+
+        assert await executor.call("x") == "secondary:x"
+        await asyncio.sleep(0)
+        return primary
+
+    primary = asyncio.run(scenario())
+    # The cancelled attempt is kept as a lower-bound latency sample
+    assert len(primary.latency._samples) == 1
+    assert primary.latency._samples[0] >= 0.05
+
+
+def test_no_hedge_without_budget():
+    async def scenario():
+        primary, _ = _backend("primary", delay=0.1)
+        secondary, secondary_calls = _backend("secondary")
+        executor = HedgedExecutor([primary, secondary], HedgeBudget(ratio=0.0), initial_delay=0.01)
+
+        assert await executor.call("x") == "primary:x"
+        assert secondary_calls == []
+
+    asyncio.run(scenario())
+
+
+def test_failed_primary_fails_over():
+    async def scenario():
+        primary, _ = _backend("primary", error=RuntimeError("boom"))
+        secondary, _ = _backend("secondary")
+        executor = HedgedExecutor([primary, secondary], HedgeBudget(ratio=0.0), initial_delay=10.0)
+
+        assert await executor.call("x") == "secondary:x"
+
+    asyncio.run(scenario())
+
+
+def test_last_error_is_raised_when_all_backends_fail():
+    async def scenario():
+        primary, _ = _backend("primary", error=RuntimeError("primary"))
+        secondary, _ = _backend("secondary", error=ValueError("secondary"))
+        executor = HedgedExecutor([primary, secondary], HedgeBudget(ratio=0.0))
+
+        with pytest.raises(ValueError):
+            await executor.call("x")
+
+    asyncio.run(scenario())
+
+
+def test_open_breaker_skips_backend_until_probe():
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        primary, primary_calls = _backend("primary", error=RuntimeError("down"), breaker=breaker)
+        secondary, _ = _backend("secondary")
+        executor = HedgedExecutor([primary, secondary], HedgeBudget(ratio=0.0))
+
+        for _ in range(2):
+            assert await executor.call("x") == "secondary:x"
+        assert len(primary_calls) == 2
+
+        # Ejected: the primary is not called while the breaker is open
+        assert await executor.call("x") == "secondary:x"
+        assert len(primary_calls) == 2
+
+        # After the cool-down a single probe goes through and closes the breaker on success
+        await asyncio.sleep(0.06)
+        primary.call = _backend("primary")[0].call
+        assert await executor.call("x") == "primary:x"
+        assert breaker.allow_request()
+
+    asyncio.run(scenario())
+
+
+def test_executor_without_earning_spends_shared_budget():
+    async def scenario():
+        budget = HedgeBudget(ratio=1.0, burst=1.0)
+        primary, _ = _backend("primary", delay=0.2)
+        secondary, secondary_calls = _backend("secondary")
+        executor = HedgedExecutor([primary, secondary], budget, initial_delay=0.01, earn_budget=False)
+
+        # Nothing was earned, so the slow primary is not hedged
+        assert await executor.call("x") == "primary:x"
+        assert secondary_calls == []
+
+        # Budget earned elsewhere (once per page) pays for the next hedge
+        budget.on_call()
+        assert await executor.call("y") == "secondary:y"
+
+    asyncio.run(scenario())
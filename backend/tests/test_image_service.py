@@ -0,0 +1,15 @@
+from app.core.config import settings
+from app.services import image_service
+
+
+def test_render_tag_changes_with_render_settings(monkeypatch):
+    thumbnail = image_service.render_tag("thumbnail")
+    assert image_service.render_tag("original") == ""
+    assert thumbnail != image_service.render_tag("preview")
+
+    monkeypatch.setattr(settings, "DERIVATIVE_JPEG_QUALITY", settings.DERIVATIVE_JPEG_QUALITY + 1)
+    requality = image_service.render_tag("thumbnail")
+    assert requality != thumbnail
+
+    monkeypatch.setitem(image_service.DERIVATIVE_SIZES, "thumbnail", image_service.DERIVATIVE_SIZES["thumbnail"] + 1)
+    assert image_service.render_tag("thumbnail") not in {thumbnail, requality}
@@ -0,0 +1,60 @@
+from app.core.config import settings
+from app.services.layout_service import _tile_bounds, merge_item_values, merge_tile_results, plan_tile_grid
+
+
+def test_small_page_is_not_tiled():
+    assert plan_tile_grid(2480, 3508) == (1, 1)  # A4 at 300 dpi
+
+
+def test_large_page_is_split_in_proportion_to_its_aspect_ratio():
+    rows, columns = plan_tile_grid(4960, 3508)  # A3 landscape at 300 dpi
+    assert (rows, columns) == (2, 3)
+    assert 4960 * 3508 / (rows * columns) <= settings.TILE_TARGET_PIXELS
+
+    assert plan_tile_grid(3508, 4960) == (3, 2)
+
+
+def test_tile_bounds_cover_the_page_with_overlap():
+    bounds = _tile_bounds(1000, 3, overlap=20)
+    assert bounds[0][0] == 0 and bounds[-1][1] == 1000
+    for (_, previous_end), (next_start, _) in zip(bounds, bounds[1:]):
+        assert next_start < previous_end
+
+
+def test_duplicates_from_overlapping_tiles_are_dropped():
+    assert merge_item_values(["頭痛と発熱が3日前から持続", "頭痛と発熱が3日前から持続"]) == "頭痛と発熱が3日前から持続"
+    assert merge_item_values(["頭痛と発熱が3日前から", "頭痛と発熱が3日前から持続"]) == "頭痛と発熱が3日前から持続"
+
+
+def test_short_values_contained_in_others_are_kept():
+    assert merge_item_values(["なし", "特記事項なし"]) == "なし\n特記事項なし"
+    assert merge_item_values(["特記事項なし", "なし"]) == "特記事項なし\nなし"
+
+
+def test_fragments_cut_at_a_tile_edge_are_joined():
+    left = "高血圧症にて近医通院中、降圧薬を"
+    right = "近医通院中、降圧薬を内服している"
+    assert merge_item_values([left, right]) == "高血圧症にて近医通院中、降圧薬を内服している"
+
+
+def test_short_coincidental_overlap_is_not_joined():
+    assert merge_item_values(["右膝痛あり", "あり、左肩痛"]) == "右膝痛あり\nあり、左肩痛"
+
+
+def test_unreadable_marker_is_replaced_by_readable_values():
+    assert merge_item_values(["判読不能", "糖尿病"]) == "糖尿病"
+    assert merge_item_values(["「判読不能」", "糖尿病"]) == "糖尿病"
+    assert merge_item_values(["判読不能", "「判読不能」"]) == "判読不能"
+    assert merge_item_values([]) == ""
+
+
+def test_tile_results_are_merged_per_item_in_output_order():
+    tile_results = [
+        [{"item_name": "主訴", "item_value": "腹痛"}, {"item_name": "診断", "item_value": "判読不能"}],
+        [{"item_name": "診断", "item_value": "急性胃腸炎"}, {"item_name": "主訴", "item_value": ""}],
+    ]
+    assert merge_tile_results(tile_results, ["主訴", "既往歴", "診断"]) == [
+        {"item_name": "主訴", "item_value": "腹痛"},
+        {"item_name": "既往歴", "item_value": ""},
+        {"item_name": "診断", "item_value": "急性胃腸炎"},
+    ]
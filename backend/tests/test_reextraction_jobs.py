@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import Chart, ProcessStatus, ReextractionJob
+from app.db.partitioning import new_chart_id
+from app.db.session import Base
+from app.services import db_service
+
+
+def _run(scenario):
+    async def wrapper():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        try:
+            await scenario(async_session)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(wrapper())
+
+
+def test_pending_job_is_claimed_once():
+    async def scenario(async_session):
+        async with async_session() as session:
+            job = await db_service.get_or_create_reextraction_job(session, "v1", ["v1"])
+            assert job.status == ProcessStatus.PENDING.value
+
+        async with async_session() as first, async_session() as second:
+            claims = [
+                await db_service.claim_reextraction_job(first, job.id, lease_seconds=900),
+                await db_service.claim_reextraction_job(second, job.id, lease_seconds=900),
+            ]
+
+        assert claims[0] is not None
+        assert claims[0].status == ProcessStatus.PROCESSING.value
+        assert claims[1] is None
+
+    _run(scenario)
+
+
+def test_job_with_expired_lease_is_taken_over():
+    async def scenario(async_session):
+        async with async_session() as session:
+            job = await db_service.get_or_create_reextraction_job(session, "v1", ["v1"])
+            assert await db_service.claim_reextraction_job(session, job.id, lease_seconds=900) is not None
+
+            stale = datetime.now(timezone.utc) - timedelta(hours=1)
+            await session.execute(
+                update(ReextractionJob).where(ReextractionJob.id == job.id).values(updated_timestamp=stale)
+            )
+            await session.commit()
+
+            assert await db_service.claim_reextraction_job(session, job.id, lease_seconds=900) is not None
+            # The takeover renewed the lease
+            assert await db_service.claim_reextraction_job(session, job.id, lease_seconds=900) is None
+
+    _run(scenario)
+
+
+def test_unfinished_job_is_reused():
+    async def scenario(async_session):
+        async with async_session() as session:
+            first = await db_service.get_or_create_reextraction_job(session, "v1", ["v1"])
+            second = await db_service.get_or_create_reextraction_job(session, "v1", ["v1"])
+            other_version = await db_service.get_or_create_reextraction_job(session, "v2", ["v2"])
+
+        assert first.id == second.id
+        assert other_version.id != first.id
+
+    _run(scenario)
+
+
+def test_stale_charts_are_read_per_version_in_id_order():
+    async def scenario(async_session):
+        versions = [None, "old", "current", "old", "older", "old"]
+        chart_ids = sorted(new_chart_id() for _ in versions)
+        async with async_session() as session:
+            for chart_id, version in zip(chart_ids, versions):
+                session.add(Chart(
+                    id=chart_id, gcs_uri=f"gs://bucket/{chart_id}.png", status=ProcessStatus.COMPLETED.value,
+                    extraction_version=version
+                ))
+            session.add(Chart(id=new_chart_id(), gcs_uri="gs://bucket/p.png", status=ProcessStatus.PENDING.value))
+            await session.commit()
+
+            assert await db_service.count_stale_charts(session, ["current"]) == 5
+            assert await db_service.get_stale_versions(session, ["current"]) == [None, "old", "older"]
+
+            first = await db_service.get_stale_charts(session, "old", None, limit=2)
+            assert [chart.id for chart in first] == [chart_ids[1], chart_ids[3]]
+            rest = await db_service.get_stale_charts(session, "old", first[-1].id, limit=2)
+            assert [chart.id for chart in rest] == [chart_ids[5]]
+            assert [chart.id for chart in await db_service.get_stale_charts(session, None, None, limit=10)] == [chart_ids[0]]
+
+    _run(scenario)
@@ -0,0 +1,113 @@
+import asyncio
+
+from app.tasks.scheduler import ExtractionScheduler
+
+
+def _make_scheduler(**overrides):
+    options = dict(
+        weights={"interactive": 8, "bulk": 1},
+        max_concurrency=4,
+        reserved_interactive_slots=1,
+        max_concurrency_per_tenant=3,
+    )
+    options.update(overrides)
+    return ExtractionScheduler(**options)
+
+
+def test_interactive_job_starts_while_bulk_is_saturated():
+    async def scenario():
+        scheduler = _make_scheduler()
+        release = asyncio.Event()
+        started = []
+
+        async def job(name):
+            started.append(name)
+            await release.wait()
+            return name
+
+        bulk = [scheduler.submit("bulk", "tenant", job, f"bulk-{i}") for i in range(10)]
+        await asyncio.sleep(0)
+        assert started == ["bulk-0", "bulk-1", "bulk-2"]
+
+        interactive = scheduler.submit("interactive", "tenant", job, "interactive")
+        await asyncio.sleep(0)
+        assert "interactive" in started
+
+        release.set()
+        assert await interactive == "interactive"
+        await asyncio.gather(*bulk)
+
+    asyncio.run(scenario())
+
+
+def test_single_tenant_bulk_work_uses_idle_background_slots():
+    async def scenario():
+        scheduler = _make_scheduler(max_concurrency=8, reserved_interactive_slots=2, max_concurrency_per_tenant=4)
+        release = asyncio.Event()
+        started = []
+
+        async def job(name):
+            started.append(name)
+            await release.wait()
+
+        futures = [scheduler.submit("bulk", "tenant", job, f"bulk-{i}") for i in range(10)]
+        await asyncio.sleep(0)
+        assert len(started) == 6
+        assert scheduler.queued_count("bulk") == 4
+
+        release.set()
+        await asyncio.gather(*futures)
+        assert scheduler.queued_count() == 0
+
+    asyncio.run(scenario())
+
+
+def test_tenant_over_its_cap_yields_to_waiting_tenant():
+    async def scenario():
+        scheduler = _make_scheduler(max_concurrency=2, reserved_interactive_slots=0, max_concurrency_per_tenant=1)
+        releases = {}
+        started = []
+
+        async def job(name):
+            started.append(name)
+            releases[name] = asyncio.Event()
+            await releases[name].wait()
+
+        futures = [scheduler.submit("bulk", "big", job, f"big-{i}") for i in range(3)]
+        futures.append(scheduler.submit("bulk", "small", job, "small-0"))
+        await asyncio.sleep(0)
+        assert started == ["big-0", "big-1"]
+
+        # big is over its cap, so the freed slot goes to the waiting tenant
+        releases["big-0"].set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert started == ["big-0", "big-1", "small-0"]
+
+        for name in ["big-1", "small-0"]:
+            releases[name].set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        releases["big-2"].set()
+        await asyncio.gather(*futures)
+
+    asyncio.run(scenario())
+
+
+def test_interactive_jobs_are_preferred_over_queued_bulk_work():
+    async def scenario():
+        scheduler = _make_scheduler(max_concurrency=1, max_concurrency_per_tenant=1)
+        order = []
+
+        async def job(name):
+            order.append(name)
+            await asyncio.sleep(0)
+
+        futures = [scheduler.submit("bulk", "backfill", job, f"bulk-{i}") for i in range(3)]
+        futures.append(scheduler.submit("interactive", "clinic", job, "interactive"))
+        await asyncio.gather(*futures)
+
+        assert order[0] == "bulk-0"
+        assert order[1] == "interactive"
+
+    asyncio.run(scenario())
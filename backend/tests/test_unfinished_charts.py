@@ -0,0 +1,37 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import ProcessStatus
+from app.db.partitioning import new_chart_id
+from app.db.session import Base
+from app.services import db_service
+
+
+def test_unfinished_charts_keep_their_scheduling_class_and_tenant():
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        chart_ids = sorted(new_chart_id() for _ in range(4))
+        async with async_session() as session:
+            for chart_id, scheduling_class in zip(chart_ids, ["bulk", "interactive", "bulk", "bulk"]):
+                await db_service.create_chart_record(
+                    session, chart_id, "a.png", f"gs://bucket/{chart_id}.png", "image/png", scheduling_class, "tenant"
+                )
+            await db_service.update_chart_status(session, chart_ids[1], ProcessStatus.PROCESSING.value)
+            await db_service.update_chart_status(session, chart_ids[2], ProcessStatus.COMPLETED.value)
+            await db_service.update_chart_status(session, chart_ids[3], ProcessStatus.FAILED.value, "error")
+
+            charts = await db_service.get_unfinished_charts(session)
+
+        assert [(c.id, c.scheduling_class, c.tenant_id) for c in charts] == [
+            (chart_ids[0], "bulk", "tenant"),
+            (chart_ids[1], "interactive", "tenant"),
+        ]
+        await engine.dispose()
+
+    asyncio.run(scenario())